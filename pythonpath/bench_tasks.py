@@ -0,0 +1,34 @@
+"""
+Benchmark Celery tasks (bench_worker_profiles.py --celery)
+
+Not part of the regular worker: bench.run_query runs arbitrary SQL on any
+database without access checks. Only registered (CeleryConfig.imports)
+when the worker starts with SUPERSET_BENCH_TASKS=1:
+
+    SUPERSET_BENCH_TASKS=1 docker compose up -d superset-worker
+"""
+
+import os
+
+from superset.extensions import celery_app
+
+from bench_worker_profiles import pss_mb
+
+
+@celery_app.task(name="bench.run_query")
+def bench_run_query(database_id: int, sql: str) -> dict:
+    """Run one query through Superset and report the worker's memory"""
+    from billiard.process import current_process
+    from superset import db
+    from superset.models.core import Database
+
+    db.session.get(Database, database_id).get_df(sql)
+
+    # Prefork children also report the parent holding the shared pages
+    forked = current_process().name != "MainProcess"
+    return {
+        "pid": os.getpid(),
+        "pss_mb": pss_mb(),
+        "parent_pid": os.getppid() if forked else None,
+        "parent_pss_mb": pss_mb(os.getppid()) if forked else 0.0,
+    }
@@ -0,0 +1,186 @@
+"""
+Worker Profile Benchmark: prefork vs threads
+
+Runs the same batch of Trino queries with the concurrency model of each
+Celery worker profile and reports throughput and memory:
+- prefork: N processes (CELERYD_CONCURRENCY), one query at a time each,
+  own HTTP session per connection
+- threads: one process, N threads, shared keep-alive HTTP pool
+  (hooks.trino_hooks, superset-worker-io)
+
+Memory is PSS summed over the processes of a profile.
+
+Point it at trino-proxy (2s delay per request) to mimic slow nextUri
+long-polls, and preload superset to account for the per-process import
+cost of a real worker:
+
+    docker exec -it superset python /app/pythonpath/bench_worker_profiles.py \
+        --host trino-proxy --port 8081 --queries 64 \
+        --processes 4 --threads 32 --preload superset.app
+
+--celery runs the queries as bench.run_query tasks (bench_tasks) through
+Superset's Database on the real workers instead. The task is only
+registered on workers started with SUPERSET_BENCH_TASKS=1; keep one worker
+profile running at a time, since both consume the default queue:
+
+    docker compose stop superset-worker-io
+    SUPERSET_BENCH_TASKS=1 docker compose up -d superset-worker
+    docker exec -it superset python /app/pythonpath/bench_worker_profiles.py \
+        --celery --database-id 1 --slots 4 --queries 64
+    docker compose stop superset-worker
+    SUPERSET_BENCH_TASKS=1 docker compose --profile io up -d superset-worker-io
+    docker exec -it superset python /app/pythonpath/bench_worker_profiles.py \
+        --celery --database-id 1 --slots 32 --queries 64
+"""
+
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+
+def pss_mb(pid="self") -> float:
+    """
+    Proportional set size of a process in MB (Linux)
+
+    Pages shared with other processes (copy-on-write pages of a preloaded
+    parent) are split between them, so summing PSS over the processes of
+    a worker counts them once; RSS would count them once per child.
+    """
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _run_query(args) -> None:
+    import trino
+
+    conn = trino.dbapi.connect(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        catalog=args.catalog,
+        schema=args.schema,
+    )
+    try:
+        cursor = conn.cursor()
+        cursor.execute(args.sql)
+        cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def _prefork_child(job) -> float:
+    args, count = job
+    for _ in range(count):
+        _run_query(args)
+    return pss_mb()
+
+
+def bench_prefork(args) -> dict:
+    counts = [args.queries // args.processes] * args.processes
+    for i in range(args.queries % args.processes):
+        counts[i] += 1
+
+    start = time.perf_counter()
+    with Pool(args.processes) as pool:
+        child_pss = pool.map(_prefork_child, [(args, c) for c in counts])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "profile": f"prefork x{args.processes}",
+        "slots": args.processes,
+        "seconds": elapsed,
+        "pss_mb": pss_mb() + sum(child_pss),
+    }
+
+
+def bench_threads(args) -> dict:
+    os.environ["TRINO_HTTP_POOL_SIZE"] = str(args.threads)
+    from hooks.trino_hooks import install_trino_http_pool
+    install_trino_http_pool()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        list(executor.map(lambda _: _run_query(args), range(args.queries)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "profile": f"threads x{args.threads}",
+        "slots": args.threads,
+        "seconds": elapsed,
+        "pss_mb": pss_mb(),
+    }
+
+
+def bench_celery(args) -> dict:
+    """Run the queries as tasks on the worker consuming the default queue"""
+    from superset.tasks.celery_app import app as celery_app
+
+    start = time.perf_counter()
+    pending = [
+        celery_app.send_task("bench.run_query", args=[args.database_id, args.sql])
+        for _ in range(args.queries)
+    ]
+    reports = [result.get(timeout=3600) for result in pending]
+    elapsed = time.perf_counter() - start
+
+    # Largest PSS seen per process (children and the prefork parent)
+    pss = {}
+    for report in reports:
+        for pid, mb in ((report["pid"], report["pss_mb"]),
+                        (report["parent_pid"], report["parent_pss_mb"])):
+            if pid is not None:
+                pss[pid] = max(pss.get(pid, 0.0), mb)
+
+    return {
+        "profile": f"celery ({len(pss)} proc)",
+        "slots": args.slots,
+        "seconds": elapsed,
+        "pss_mb": sum(pss.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="trino-proxy")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--user", default="bench")
+    parser.add_argument("--catalog", default="iceberg")
+    parser.add_argument("--schema", default="default")
+    parser.add_argument("--sql", default="SELECT 1")
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument(
+        "--preload", action="append", default=[],
+        help="Module imported before the run (e.g. superset.app), repeatable",
+    )
+    parser.add_argument("--celery", action="store_true", help="Run through the Celery workers")
+    parser.add_argument("--database-id", type=int, default=1, help="Superset database (--celery)")
+    parser.add_argument("--slots", type=int, default=4, help="Worker concurrency (--celery)")
+    args = parser.parse_args()
+
+    for module in args.preload:
+        importlib.import_module(module)
+
+    if args.celery:
+        results = [bench_celery(args)]
+    else:
+        # prefork first: threads installs the shared pool into this process
+        results = [bench_prefork(args), bench_threads(args)]
+
+    print(f"{'profile':<16} {'seconds':>9} {'queries/s':>10} {'pss MB':>9} {'MB/slot':>8}")
+    for r in results:
+        print(
+            f"{r['profile']:<16} {r['seconds']:>9.2f} {args.queries / r['seconds']:>10.2f} "
+            f"{r['pss_mb']:>9.1f} {r['pss_mb'] / r['slots']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Alert execution hooks (Worker-side)
+
+Hooks into alert evaluation to add:
+- Change gating: an alert whose tables have no new Iceberg snapshot since
+  its last evaluation is not re-run against Trino; the previous result
+  is reused and the skip is logged with its reason
+
+An alert is evaluated normally when:
+- Its SQL is templated (Jinja {{ ... }} / {% ... %}), since the rendered
+  query can change between ticks
+- Its database isn't Trino, or its SQL can't be mapped to Iceberg tables
+  (other catalogs, unqualified names) or uses the current time
+  (now(), current_date, ...)
+- Its SQL or validator changed, or it was never evaluated
+- Any table's metadata_location changed (one catalog lookup per tick)
+- The last evaluation is older than ALERT_CHANGE_GATE_MAX_SKIP_SECONDS
+"""
+
+import hashlib
+import json
+import time
+from functools import wraps
+from typing import Any, Optional, Tuple
+
+from hooks.redis_client import get_redis
+
+GATE_REDIS_DB = 4
+GATE_KEY = "alert_gate:{report_id}"
+GATE_TTL_SECONDS = 86400 * 7
+
+DEFAULT_MAX_SKIP_SECONDS = 86400
+
+def _alert_fingerprint(report: Any) -> str:
+    """Hash of everything besides the data that decides the alert result"""
+    return hashlib.md5(json.dumps([
+        report.sql,
+        report.database_id,
+        str(report.validator_type),
+        report.validator_config_json,
+    ], default=str).encode()).hexdigest()
+
+
+def check_alert_gate(report: Any, max_skip_seconds: int) -> Tuple[Optional[bool], str, Optional[dict]]:
+    """
+    Args:
+        report: ReportSchedule of type Alert
+        max_skip_seconds: Re-evaluate at least this often
+
+    Returns:
+        tuple: (previous result to reuse or None to evaluate, reason,
+                metadata locations of the alert's tables or None)
+    """
+    from hooks.iceberg_catalog import (
+        TIME_DEPENDENT_RE,
+        database_tables,
+        fetch_metadata_locations,
+    )
+
+    sql = report.sql or ""
+    # ENABLE_TEMPLATE_PROCESSING: the rendered SQL can change between ticks
+    # (Jinja inside string literals parses fine, so check before parsing)
+    if "{{" in sql or "{%" in sql:
+        return None, "templated SQL", None
+    if TIME_DEPENDENT_RE.search(sql):
+        return None, "SQL depends on the current time", None
+
+    # Same resolution as the chart cache index: Trino only, names without a
+    # catalog through the connection's default catalog
+    tables = database_tables(report.database, sql=sql) if sql else None
+    if not tables:
+        return None, "tables not resolvable to the Iceberg catalog", None
+
+    locations = fetch_metadata_locations(tables)
+    if set(locations) != tables:
+        return None, f"not Iceberg tables: {', '.join(sorted(tables - set(locations)))}", None
+
+    state = get_redis(GATE_REDIS_DB).hgetall(GATE_KEY.format(report_id=report.id))
+    if not state:
+        return None, "no previous evaluation", locations
+    if state.get("fingerprint") != _alert_fingerprint(report):
+        return None, "alert SQL or validator changed", locations
+    if time.time() - float(state.get("evaluated_at", 0)) > max_skip_seconds:
+        return None, f"last evaluation older than {max_skip_seconds}s", locations
+
+    previous = json.loads(state.get("locations", "{}"))
+    changed = sorted(t for t in tables if previous.get(t) != locations[t])
+    if changed:
+        return None, f"new snapshot in {', '.join(changed)}", locations
+
+    return state.get("result") == "1", f"no new snapshot in {', '.join(sorted(tables))}", locations
+
+
+def record_alert_evaluation(report: Any, locations: dict, result: bool) -> None:
+    """Remember the snapshots an evaluation read and its result"""
+    key = GATE_KEY.format(report_id=report.id)
+    pipe = get_redis(GATE_REDIS_DB).pipeline(transaction=False)
+    pipe.hset(key, mapping={
+        "fingerprint": _alert_fingerprint(report),
+        "locations": json.dumps(locations),
+        "result": "1" if result else "0",
+        "evaluated_at": time.time(),
+    })
+    pipe.expire(key, GATE_TTL_SECONDS)
+    pipe.execute()
+
+
+def install_alert_change_gate():
+    """
+    Skip alert evaluation when none of its Iceberg tables changed
+
+    Hooks into AlertCommand.run(), which runs the alert SQL against the
+    database and returns whether the alert is triggered.
+    """
+    from flask import current_app
+    from superset.commands.report.alert import AlertCommand
+
+    original_run = AlertCommand.run
+
+    @wraps(original_run)
+    def run_gated(self):
+        report = self._report_schedule
+        locations = None
+        try:
+            max_skip_seconds = current_app.config.get(
+                "ALERT_CHANGE_GATE_MAX_SKIP_SECONDS", DEFAULT_MAX_SKIP_SECONDS
+            )
+            previous, reason, locations = check_alert_gate(report, max_skip_seconds)
+            if previous is not None:
+                print(f"[Alert Gate] Skip alert {report.id} ({report.name}): {reason}, "
+                      f"reusing result triggered={previous}")
+                return previous
+            print(f"[Alert Gate] Evaluate alert {report.id} ({report.name}): {reason}")
+        except Exception as e:
+            # Gate failures must never suppress an alert: evaluate normally
+            print(f"[Alert Gate] Error checking alert {report.id}: {e}")
+
+        # Snapshots are read before evaluating: a commit during evaluation
+        # shows up as a change at the next tick
+        result = original_run(self)
+
+        if locations is not None:
+            try:
+                record_alert_evaluation(report, locations, result)
+            except Exception as e:
+                print(f"[Alert Gate] Error recording alert {report.id}: {e}")
+        return result
+
+    AlertCommand.run = run_gated
+    print("✓ Alert change gate installed (AlertCommand.run)")
@@ -0,0 +1,167 @@
+"""
+Iceberg-snapshot-driven chart cache invalidation
+
+Instead of a fixed DATA_CACHE_CONFIG timeout for every dataset:
+- At cache-write time each chart cache key is indexed under the Iceberg
+  tables its datasource reads (Redis sorted set per table, scored by the
+  entry's expiry; expired members are dropped on every write)
+- Entries over tables tracked in the Iceberg catalog live for
+  DATA_CACHE_SNAPSHOT_TIMEOUT instead of the default timeout (their data
+  can't change unnoticed); queries with a now-relative time window or
+  time-dependent dataset SQL (current_date, now(), ...) and explicit
+  cache_timeouts keep their timeout
+- A beat task polls `metadata_location` of all catalog tables in one
+  query and deletes exactly the cache keys indexed under changed tables
+
+Polling (ICEBERG_WATCH_INTERVAL_SECONDS) is used instead of LISTEN/NOTIFY
+so that nothing has to be installed into the catalog database Trino owns.
+
+Shared between web server (sync cache writes) and Celery workers.
+"""
+
+import time
+from typing import Any, Iterable, Optional
+
+from hooks.iceberg_catalog import database_tables, fetch_metadata_locations
+from hooks.redis_client import get_redis
+
+INDEX_REDIS_DB = 4
+# cache key -> epoch seconds the entry expires at
+INDEX_KEY = "cache_index:expiry:{table}"
+# "schema.table" -> last seen metadata_location
+LOCATIONS_KEY = "iceberg_metadata_location"
+# "schema.table" -> epoch seconds of the last detected change
+CHANGED_AT_KEY = "iceberg_changed_at"
+
+# A query still running when its table changed may write a result of the
+# previous snapshot after the invalidation: such entries get the regular
+# timeout (window covers the longest async query)
+RECENT_CHANGE_SECONDS = 1800
+
+DEFAULT_SNAPSHOT_TIMEOUT = 86400 * 7
+
+
+def datasource_tables(datasource: Any) -> Optional[set]:
+    """
+    Args:
+        datasource: SqlaTable of the chart
+
+    Returns:
+        set: "schema.table" names the datasource reads, or None if they
+             can't be determined (non-Trino database, other catalog,
+             unparseable SQL)
+    """
+    return database_tables(
+        getattr(datasource, "database", None),
+        sql=getattr(datasource, "sql", None),
+        table_name=datasource.table_name,
+        schema=datasource.schema,
+        catalog=getattr(datasource, "catalog", None),
+    )
+
+
+def index_cache_key(
+    cache_key: str,
+    tables: Iterable[str],
+    timeout: Optional[int],
+    snapshot_timeout: Optional[int],
+    default_timeout: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Index a chart cache key under the tables it depends on
+
+    Args:
+        cache_key: Data cache key (without CACHE_KEY_PREFIX)
+        tables: "schema.table" names the cached result was computed from
+        timeout: Timeout the entry would get without snapshot tracking
+        snapshot_timeout: Timeout for entries whose tables are all tracked
+                          (None: keep `timeout`, index only)
+        default_timeout: DATA_CACHE_CONFIG["CACHE_DEFAULT_TIMEOUT"]; only
+                         entries with the default timeout are extended,
+                         chart / dataset / database cache_timeouts are kept
+
+    Returns:
+        int: Timeout to cache the entry with
+    """
+    tables = sorted(tables)
+    # Negative timeout: caching is disabled, nothing gets written
+    if not tables or (timeout is not None and timeout < 0):
+        return timeout
+
+    r = get_redis(INDEX_REDIS_DB)
+    pipe = r.pipeline(transaction=False)
+    pipe.hmget(LOCATIONS_KEY, tables)
+    pipe.hmget(CHANGED_AT_KEY, tables)
+    locations, changed_at = pipe.execute()
+
+    recently_changed = any(
+        ts and time.time() - float(ts) < RECENT_CHANGE_SECONDS for ts in changed_at
+    )
+    is_default = timeout is None or timeout == default_timeout
+    if snapshot_timeout and is_default and all(locations) and not recently_changed:
+        timeout = snapshot_timeout
+
+    # Index must outlive the entry it points to; entries without a known
+    # timeout (default / never) are assumed to live as long as the index
+    index_ttl = max(timeout or 0, DEFAULT_SNAPSHOT_TIMEOUT)
+    now = time.time()
+    expires_at = now + (timeout or index_ttl)
+    pipe = r.pipeline(transaction=False)
+    for table in tables:
+        index_key = INDEX_KEY.format(table=table)
+        pipe.zremrangebyscore(index_key, "-inf", now)
+        pipe.zadd(index_key, {cache_key: expires_at})
+        pipe.expire(index_key, index_ttl)
+    pipe.execute()
+    return timeout
+
+
+def invalidate_changed_tables() -> dict:
+    """
+    Delete cache entries of tables whose metadata_location changed
+
+    Returns:
+        dict: tables (tracked), changed (table names), invalidated (keys)
+    """
+    from superset.extensions import cache_manager
+
+    current = fetch_metadata_locations()
+    r = get_redis(INDEX_REDIS_DB)
+    known = r.hgetall(LOCATIONS_KEY)
+
+    # First sighting of a table is not a change: nothing indexed can be stale
+    changed = [t for t, loc in current.items() if t in known and known[t] != loc]
+    updates = {t: loc for t, loc in current.items() if known.get(t) != loc}
+
+    # Mark changes first: entries written from now on get the regular timeout
+    now = time.time()
+    pipe = r.pipeline(transaction=False)
+    if changed:
+        pipe.hset(CHANGED_AT_KEY, mapping={t: now for t in changed})
+    for table in changed:
+        # Entries that are still alive, expired ones are gone already
+        pipe.zrangebyscore(INDEX_KEY.format(table=table), now, "+inf")
+    indexed = pipe.execute()[1:] if changed else []
+    cache_keys = set().union(*indexed)
+
+    if cache_keys:
+        cache_manager.data_cache.delete_many(*cache_keys)
+
+    # Only drop what was invalidated (and expired), keys indexed meanwhile stay
+    pipe = r.pipeline(transaction=False)
+    for table, members in zip(changed, indexed):
+        index_key = INDEX_KEY.format(table=table)
+        pipe.zremrangebyscore(index_key, "-inf", now)
+        if members:
+            pipe.zrem(index_key, *members)
+    if updates:
+        pipe.hset(LOCATIONS_KEY, mapping=updates)
+    pipe.execute()
+
+    for table in changed:
+        print(f"[Cache Invalidation] {table} changed, invalidated its chart cache entries")
+    print(
+        f"[Cache Invalidation] Tracked: {len(current)}, changed: {len(changed)}, "
+        f"invalidated keys: {len(cache_keys)}"
+    )
+    return {"tables": len(current), "changed": changed, "invalidated": len(cache_keys)}
@@ -0,0 +1,215 @@
+"""
+Chart cache key canonicalization
+
+Semantically identical chart requests should share one DATA_CACHE_CONFIG
+entry. Before the cache probe, query objects are normalized:
+- Filters sorted (and IN / NOT IN values sorted, duplicates dropped)
+- Empty extras (where: "", having: "", ...) dropped
+- Relative time bounds ("Last 7 days", "... : now") snapped down to
+  CHART_CACHE_TIME_BUCKET_SECONDS, so `now` no longer varies per request.
+  QueryObject.cache_key() keys on the time_range string, not on
+  from_dttm / to_dttm: snapping only changes the key where inner_*_dttm
+  are set (time comparison / time offset queries)
+
+Probe results are counted in Redis to report the hit-ratio uplift
+(hits that only matched because the key was canonicalized).
+
+Shared between web server (cache probe) and Celery workers (cache write).
+"""
+
+import json
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from hooks.redis_client import get_redis
+
+METRICS_REDIS_DB = 4
+METRICS_KEY = "chart_cache_metrics"
+
+DEFAULT_TIME_BUCKET_SECONDS = 300
+
+_IN_OPERATORS = {"IN", "NOT IN"}
+_TIME_RANGE_SEPARATOR = " : "
+
+
+def _time_bucket_seconds() -> int:
+    try:
+        from flask import current_app
+        return int(current_app.config.get(
+            "CHART_CACHE_TIME_BUCKET_SECONDS", DEFAULT_TIME_BUCKET_SECONDS
+        ))
+    except RuntimeError:
+        # Outside app context
+        return DEFAULT_TIME_BUCKET_SECONDS
+
+
+def _sort_key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _canonical_filter(flt: dict) -> dict:
+    flt = dict(flt)
+    if flt.get("op") in _IN_OPERATORS and isinstance(flt.get("val"), (list, tuple)):
+        unique = {_sort_key(v): v for v in flt["val"]}
+        flt["val"] = [unique[k] for k in sorted(unique)]
+    return flt
+
+
+def _is_absolute(bound: str) -> bool:
+    """True if a time range side is a literal datetime (not now-relative)"""
+    try:
+        datetime.fromisoformat(bound.strip())
+        return True
+    except ValueError:
+        return False
+
+
+def has_relative_time_range(query_obj: Any) -> bool:
+    """
+    Args:
+        query_obj: superset.common.query_object.QueryObject
+
+    Returns:
+        bool: True if the query's time window moves with `now`, i.e. its
+              result can change without the data changing
+    """
+    time_ranges = [getattr(query_obj, "time_range", None)] + [
+        f.get("val") for f in (query_obj.filter or []) if f.get("op") == "TEMPORAL_RANGE"
+    ]
+    for time_range in time_ranges:
+        if not isinstance(time_range, str) or time_range in ("", "No filter"):
+            continue
+        if not all(_is_absolute(side) for side in time_range.split(_TIME_RANGE_SEPARATOR)):
+            return True
+    return False
+
+
+def _floor(dttm: datetime, bucket_seconds: int) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=dttm.tzinfo)
+    offset = (dttm - epoch).total_seconds() % bucket_seconds
+    return dttm - timedelta(seconds=offset)
+
+
+def _snap_time_bounds(query_obj: Any, bucket_seconds: int) -> None:
+    time_range = getattr(query_obj, "time_range", None)
+    if not time_range or bucket_seconds <= 0:
+        return
+
+    sides = time_range.split(_TIME_RANGE_SEPARATOR)
+    since, until = (sides[0], sides[-1]) if len(sides) == 2 else (time_range, time_range)
+
+    for attr, bound in (
+        ("from_dttm", since),
+        ("inner_from_dttm", since),
+        ("to_dttm", until),
+        ("inner_to_dttm", until),
+    ):
+        dttm = getattr(query_obj, attr, None)
+        if isinstance(dttm, datetime) and not _is_absolute(bound):
+            setattr(query_obj, attr, _floor(dttm, bucket_seconds))
+
+
+def canonicalize_query_object(query_obj: Any, bucket_seconds: int) -> bool:
+    """
+    Normalize a QueryObject in place
+
+    Args:
+        query_obj: superset.common.query_object.QueryObject
+        bucket_seconds: Relative time bound bucket (0 disables snapping)
+
+    Returns:
+        bool: True if sorting filters / IN values or snapping time bounds
+              changed the cache key, i.e. equivalent requests would
+              otherwise have had different keys
+    """
+    # Empty extras are sent the same way by every request: dropping them
+    # changes the key, but never turns a miss into a hit
+    if query_obj.extras:
+        query_obj.extras = {
+            k: v for k, v in query_obj.extras.items() if v is not None and v != ""
+        }
+
+    # Compare the actual cache key: to_dict() also holds from_dttm / to_dttm,
+    # which cache_key() leaves out
+    before = query_obj.cache_key()
+    unique = {_sort_key(f): f for f in map(_canonical_filter, query_obj.filter or [])}
+    query_obj.filter = [unique[k] for k in sorted(unique)]
+
+    _snap_time_bounds(query_obj, bucket_seconds)
+    return query_obj.cache_key() != before
+
+
+def canonicalize_query_context(query_context: Any, bucket_seconds: Optional[int] = None) -> bool:
+    """
+    Normalize all query objects of a QueryContext in place
+
+    Args:
+        query_context: superset.common.query_context.QueryContext
+        bucket_seconds: Defaults to CHART_CACHE_TIME_BUCKET_SECONDS
+
+    Returns:
+        bool: True if canonicalization changed a query in a way that
+              varies between equivalent requests (see canonicalize_query_object)
+    """
+    if bucket_seconds is None:
+        bucket_seconds = _time_bucket_seconds()
+
+    changed = False
+    for query_obj in query_context.queries:
+        changed = canonicalize_query_object(query_obj, bucket_seconds) or changed
+    return changed
+
+
+def record_cache_probe(hit: bool, canonicalized: bool) -> None:
+    """
+    Count a chart cache probe
+
+    Args:
+        hit: Cache probe found a result
+        canonicalized: Canonicalization changed the cache key, i.e. the
+                       hit would likely have been a miss without it
+    """
+    record_cache_probes(1, int(hit), int(hit and canonicalized))
+
+
+def record_cache_probes(probes: int, hits: int, canonical_hits: int) -> None:
+    """Count a batch of chart cache probes (see record_cache_probe)"""
+    try:
+        pipe = get_redis(METRICS_REDIS_DB).pipeline(transaction=False)
+        pipe.hincrby(METRICS_KEY, "probes", probes)
+        if hits:
+            pipe.hincrby(METRICS_KEY, "hits", hits)
+        if canonical_hits:
+            pipe.hincrby(METRICS_KEY, "canonical_hits", canonical_hits)
+        pipe.execute()
+    except Exception as e:
+        print(f"[Chart Cache] Error recording cache metrics: {e}")
+
+
+def get_cache_key_metrics() -> dict:
+    """
+    Returns:
+        dict: probes, hits, canonical_hits, hit_ratio, baseline_hit_ratio
+              (without canonical hits) and uplift (difference)
+    """
+    counters = get_redis(METRICS_REDIS_DB).hgetall(METRICS_KEY)
+    probes = int(counters.get("probes", 0))
+    hits = int(counters.get("hits", 0))
+    canonical_hits = int(counters.get("canonical_hits", 0))
+
+    hit_ratio = hits / probes if probes else 0.0
+    baseline_hit_ratio = (hits - canonical_hits) / probes if probes else 0.0
+    return {
+        "probes": probes,
+        "hits": hits,
+        "canonical_hits": canonical_hits,
+        "hit_ratio": hit_ratio,
+        "baseline_hit_ratio": baseline_hit_ratio,
+        "uplift": hit_ratio - baseline_hit_ratio,
+    }
+
+
+if __name__ == "__main__":
+    # python -m hooks.cache_keys
+    for name, value in get_cache_key_metrics().items():
+        print(f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}")
@@ -3,21 +3,19 @@ Chart and Dashboard execution hooks
 
 Hooks into chart/dashboard data loading to add:
 - Force refresh support for GLOBAL_ASYNC_QUERIES
+- Canonical cache keys (hooks.cache_keys) for the cache probe and workers
+- Cache index by Iceberg table for snapshot invalidation (hooks.cache_invalidation)
 - Debug logging for async query execution
 - Future: quota checking for chart queries
+
+Superset modules are imported inside the installers: hooks are installed
+lazily by hooks.registry, so unused hooks never import them.
 """
 
 import contextlib
 from functools import wraps
 from flask import request
 
-from superset.charts.data.api import ChartDataRestApi
-from superset.commands.chart.data.get_data_command import ChartDataCommand
-from superset.commands.chart.exceptions import ChartDataCacheLoadError
-from superset.commands.chart.data.create_async_job_command import CreateAsyncChartDataJobCommand
-from superset.async_events.async_query_manager import AsyncQueryTokenException
-from superset.utils.core import get_user_id
-
 
 def install_chart_force_refresh_fix():
     """
@@ -26,6 +24,14 @@ def install_chart_force_refresh_fix():
     Superset 5.0.0 has a bug where force=true bypasses async queries.
     This patch ensures force refresh also uses async execution.
     """
+    from superset.charts.data.api import ChartDataRestApi
+    from superset.commands.chart.exceptions import ChartDataCacheLoadError
+    from superset.commands.chart.data.create_async_job_command import CreateAsyncChartDataJobCommand
+    from superset.async_events.async_query_manager import AsyncQueryTokenException
+    from superset.utils.core import get_user_id
+
+    from hooks.cache_keys import canonicalize_query_context, record_cache_probe
+
     original_run_async = ChartDataRestApi._run_async
 
     @wraps(original_run_async)
@@ -35,10 +41,14 @@ def install_chart_force_refresh_fix():
         """
         # When Dashboard force refresh, skip cache check and go async
         if not command._query_context.force:
+            # Equivalent requests (filter order, relative `now`) share one key
+            canonicalized = canonicalize_query_context(command._query_context)
+            result = None
             with contextlib.suppress(ChartDataCacheLoadError):
                 result = command.run(force_cached=True)
-                if result is not None:
-                    return self._send_chart_response(result)
+            record_cache_probe(result is not None, canonicalized)
+            if result is not None:
+                return self._send_chart_response(result)
 
         # Use async execution
         async_command = CreateAsyncChartDataJobCommand()
@@ -54,12 +64,112 @@ def install_chart_force_refresh_fix():
     print("✓ Fixed Dashboard force refresh to use GLOBAL_ASYNC_QUERIES")
 
 
+def install_chart_cache_canonicalization():
+    """
+    Canonicalize query contexts built by QueryContextFactory
+
+    Workers (load_chart_data_into_cache) rebuild the query context from
+    form_data; canonicalizing it here makes them write results under the
+    same cache key the web server probes in patched_run_async.
+    """
+    from superset.common.query_context_factory import QueryContextFactory
+
+    from hooks.cache_keys import canonicalize_query_context
+
+    original_create = QueryContextFactory.create
+
+    @wraps(original_create)
+    def create_canonical(self, *args, **kwargs):
+        query_context = original_create(self, *args, **kwargs)
+        canonicalize_query_context(query_context)
+        return query_context
+
+    QueryContextFactory.create = create_canonical
+    print("✓ Chart cache key canonicalization installed (QueryContextFactory.create)")
+
+
+def install_chart_cache_index():
+    """
+    Index chart cache writes by the Iceberg tables they depend on
+
+    QueryContextProcessor.get_df_payload remembers the datasource of the
+    query being computed and whether its result depends on the current
+    time; QueryCacheManager.set uses it to index the data cache key (and
+    extend a default timeout) before writing.
+    """
+    import threading
+    from flask import current_app
+    from superset.common.query_context_processor import QueryContextProcessor
+    from superset.common.utils.query_cache_manager import QueryCacheManager
+    from superset.constants import CacheRegion
+
+    from hooks.cache_keys import has_relative_time_range
+    from hooks.cache_invalidation import (
+        DEFAULT_SNAPSHOT_TIMEOUT,
+        datasource_tables,
+        index_cache_key,
+    )
+    from hooks.iceberg_catalog import TIME_DEPENDENT_RE
+
+    current_query = threading.local()
+    original_get_df_payload = QueryContextProcessor.get_df_payload
+    original_set = QueryCacheManager.set
+
+    @wraps(original_get_df_payload)
+    def get_df_payload_tracked(self, query_obj, force_cached=False):
+        current_query.datasource = self._qc_datasource
+        # Results that move with the clock: now-relative time range, or
+        # dataset SQL / custom SQL filters using the current time
+        sql = " ".join(
+            part or "" for part in (
+                getattr(self._qc_datasource, "sql", None),
+                (query_obj.extras or {}).get("where"),
+                (query_obj.extras or {}).get("having"),
+            )
+        )
+        current_query.relative = (
+            has_relative_time_range(query_obj) or bool(TIME_DEPENDENT_RE.search(sql))
+        )
+        try:
+            return original_get_df_payload(self, query_obj, force_cached)
+        finally:
+            current_query.datasource = None
+
+    @wraps(original_set)
+    def set_indexed(key, value, timeout=None, datasource_uid=None, region=CacheRegion.DEFAULT):
+        datasource = getattr(current_query, "datasource", None)
+        if key and region == CacheRegion.DATA and datasource is not None:
+            try:
+                tables = datasource_tables(datasource)
+                if tables:
+                    # A moving time window can change without a new snapshot
+                    snapshot_timeout = None if current_query.relative else current_app.config.get(
+                        "DATA_CACHE_SNAPSHOT_TIMEOUT", DEFAULT_SNAPSHOT_TIMEOUT
+                    )
+                    default_timeout = current_app.config["DATA_CACHE_CONFIG"].get(
+                        "CACHE_DEFAULT_TIMEOUT"
+                    )
+                    timeout = index_cache_key(
+                        key, tables, timeout, snapshot_timeout, default_timeout
+                    )
+            except Exception as e:
+                # Never fail a cache write because of indexing
+                print(f"[Chart Cache] Error indexing cache key {key}: {e}")
+        return original_set(key, value, timeout, datasource_uid, region)
+
+    QueryContextProcessor.get_df_payload = get_df_payload_tracked
+    QueryCacheManager.set = staticmethod(set_indexed)
+    print("✓ Chart cache index installed (QueryCacheManager.set)")
+
+
 def install_chart_debug_logging():
     """
     Install debug logging for chart data execution
 
     Logs important context about GLOBAL_ASYNC_QUERIES behavior
     """
+    from superset.commands.chart.data.create_async_job_command import CreateAsyncChartDataJobCommand
+
     original_chart_run = CreateAsyncChartDataJobCommand.run
     # original_chart_validate = CreateAsyncChartDataJobCommand.validate
 
@@ -87,6 +197,10 @@ def install_chart_debug_logging():
 
 
 def install_chart_hooks():
-    """Install all chart-related hooks"""
+    """
+    Install all chart-related hooks
+
+    Prefer enabling hooks by name via HOOKS_ENABLED (hooks.registry).
+    """
     install_chart_force_refresh_fix()
     # install_chart_debug_logging()
@@ -0,0 +1,373 @@
+"""
+Batched dashboard chart data (Web server + Celery workers)
+
+POST /api/v1/dashboard/<id>/batch_chart_data takes the query contexts of
+all charts of a dashboard ({"charts": [<chart data request>, ...]}, each
+the body the frontend sends to /api/v1/chart/data) and:
+- Probes the data cache for every query of every chart in one pipelined
+  round trip (EXISTS on Redis, get_many on other backends)
+- Enqueues ONE Celery task (dashboard.load_charts_batch) that computes
+  the misses; at most DASHBOARD_BATCH_CONCURRENCY charts of a dashboard
+  run at a time across all batch jobs (Redis semaphore per dashboard).
+  Charts still waiting for a slot when the stream times out fail with an
+  error event instead of holding the worker
+- Streams NDJSON, one line per chart event:
+    {"index": 3, "slice_id": 12, "status": "pending", "job": {...}}
+    {"index": 0, "slice_id": 10, "status": "cached", "result": [...]}
+    {"index": 3, "slice_id": 12, "status": "done", "result_url": "..."}
+    {"index": 4, "slice_id": 13, "status": "error", "errors": [...]}
+  and a final {"status": "timeout", "pending": [...]} if charts are still
+  running after DASHBOARD_BATCH_STREAM_TIMEOUT_SECONDS
+
+Every miss gets a regular async job (same job_metadata as a 202 from
+/api/v1/chart/data), so a client that drops the stream can keep waiting
+on the GLOBAL_ASYNC_QUERIES events and fetch result_url as usual.
+
+Registered through BLUEPRINTS in superset_config.py; Superset modules are
+imported inside the functions.
+"""
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from flask import Blueprint, Response, current_app, request, stream_with_context
+
+from hooks.redis_client import get_redis
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_CHARTS = 100
+DEFAULT_STREAM_TIMEOUT_SECONDS = 120
+DEFAULT_POLL_INTERVAL_SECONDS = 0.5
+
+SLOTS_REDIS_DB = 4
+# Running charts of a dashboard: token -> epoch seconds acquired
+SLOTS_KEY = "dashboard_batch:slots:{dashboard_id}"
+# A slot whose holder died (worker killed) is reclaimed after this
+SLOT_LEASE_SECONDS = 1800
+SLOT_WAIT_SECONDS = 0.2
+
+# KEYS: slots; ARGV: now, lease, limit, token
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+dashboard_batch_bp = Blueprint("dashboard_batch", __name__)
+
+
+def _slice_id(chart: dict) -> Optional[Any]:
+    return (chart.get("form_data") or {}).get("slice_id")
+
+
+def dashboard_concurrency(dashboard_id: int, config: Any) -> int:
+    """
+    Returns:
+        int: Charts of this dashboard computed at the same time
+             (DASHBOARD_BATCH_CONCURRENCY_OVERRIDES, else the default)
+    """
+    overrides = config.get("DASHBOARD_BATCH_CONCURRENCY_OVERRIDES") or {}
+    return max(1, int(overrides.get(dashboard_id, config.get(
+        "DASHBOARD_BATCH_CONCURRENCY", DEFAULT_CONCURRENCY
+    ))))
+
+
+def probe_data_cache(keys: list) -> set:
+    """
+    Check which data cache keys exist, in one round trip
+
+    Args:
+        keys: Data cache keys (without the backend key prefix)
+
+    Returns:
+        set: Keys present in the data cache
+    """
+    from superset.extensions import cache_manager
+
+    if not keys:
+        return set()
+
+    backend = cache_manager.data_cache.cache
+    client = getattr(backend, "_read_client", None)
+    if client is not None:
+        # RedisCache: EXISTS doesn't transfer (and unpickle) the dataframes
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.exists(backend.key_prefix + key)
+        found = pipe.execute()
+    else:
+        found = cache_manager.data_cache.get_many(*keys)
+    return {key for key, value in zip(keys, found) if value}
+
+
+def _cache_keys(query_context: Any) -> Optional[list]:
+    """Data cache keys of all queries of a chart (None: not probeable)"""
+    from superset.common.chart_data import ChartDataResultFormat, ChartDataResultType
+
+    # Other result types / formats rewrite the queries or aren't JSON lines
+    if (
+        query_context.result_type != ChartDataResultType.FULL
+        or query_context.result_format != ChartDataResultFormat.JSON
+    ):
+        return None
+
+    keys = [query_context.query_cache_key(query_obj) for query_obj in query_context.queries]
+    return keys if keys and all(keys) else None
+
+
+def acquire_dashboard_slot(dashboard_id: int, limit: int, deadline: float) -> Optional[str]:
+    """
+    Wait for one of the `limit` chart slots of a dashboard
+
+    Args:
+        dashboard_id: Dashboard the chart belongs to
+        limit: Charts of the dashboard computed at the same time
+        deadline: Epoch seconds to give up at
+
+    Returns:
+        str: Token to pass to release_dashboard_slot, None on timeout
+    """
+    r = get_redis(SLOTS_REDIS_DB)
+    acquire = r.register_script(_ACQUIRE_SCRIPT)
+    key = SLOTS_KEY.format(dashboard_id=dashboard_id)
+    token = uuid.uuid4().hex
+    while not acquire(keys=[key], args=[time.time(), SLOT_LEASE_SECONDS, limit, token]):
+        if time.time() >= deadline:
+            return None
+        time.sleep(SLOT_WAIT_SECONDS)
+    return token
+
+
+def release_dashboard_slot(dashboard_id: int, token: str) -> None:
+    get_redis(SLOTS_REDIS_DB).zrem(SLOTS_KEY.format(dashboard_id=dashboard_id), token)
+
+
+def run_chart_jobs(
+    dashboard_id: int, jobs: list, concurrency: int, deadline: Optional[float] = None
+) -> None:
+    """
+    Compute charts of a dashboard (Worker-side)
+
+    Args:
+        dashboard_id: Dashboard the charts belong to
+        jobs: [job_metadata, form_data] pairs, as load_chart_data_into_cache takes
+        concurrency: Charts of this dashboard computed at the same time,
+                     shared with concurrent batch jobs of the same dashboard
+        deadline: Epoch seconds the client stream gives up at; charts without
+                  a slot by then fail (default: DEFAULT_STREAM_TIMEOUT_SECONDS
+                  from now)
+    """
+    from superset.extensions import async_query_manager
+    from superset.tasks.async_queries import load_chart_data_into_cache
+
+    app = current_app._get_current_object()
+    if deadline is None:
+        deadline = time.time() + DEFAULT_STREAM_TIMEOUT_SECONDS
+
+    def run(job):
+        job_metadata, form_data = job
+        try:
+            token = acquire_dashboard_slot(dashboard_id, concurrency, deadline)
+        except Exception as e:
+            # Redis unavailable: the per-job thread limit still applies
+            print(f"[Dashboard Batch] Dashboard {dashboard_id}: no slot ({e}), running anyway")
+            token = None
+        else:
+            if token is None:
+                # Slots held by slower (or dead) charts until the client gave up
+                message = "Timed out waiting for a dashboard chart slot"
+                print(f"[Dashboard Batch] Dashboard {dashboard_id}: chart "
+                      f"{_slice_id(form_data)}: {message}")
+                try:
+                    async_query_manager.update_job(
+                        job_metadata, async_query_manager.STATUS_ERROR,
+                        errors=[{"message": message}],
+                    )
+                except Exception as e:
+                    print(f"[Dashboard Batch] Error updating job: {e}")
+                return
+        # Each thread needs its own app context (g.user, db session)
+        try:
+            with app.app_context():
+                load_chart_data_into_cache(job_metadata, form_data)
+        except Exception as e:
+            # Already reported to the client through the job's error event
+            print(f"[Dashboard Batch] Dashboard {dashboard_id}: chart "
+                  f"{_slice_id(form_data)} failed: {e}")
+        finally:
+            if token is not None:
+                release_dashboard_slot(dashboard_id, token)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(jobs)) or 1) as executor:
+        list(executor.map(run, jobs))
+    print(f"[Dashboard Batch] Dashboard {dashboard_id}: {len(jobs)} chart(s) computed "
+          f"in {time.perf_counter() - start:.1f}s (concurrency {concurrency})")
+
+
+def _error(status: int, message: str) -> Response:
+    from superset.utils import json
+
+    return Response(json.dumps({"message": message}), status=status, mimetype="application/json")
+
+
+@dashboard_batch_bp.route("/api/v1/dashboard/<int:dashboard_id>/batch_chart_data", methods=["POST"])
+def batch_chart_data(dashboard_id: int) -> Response:
+    """Load all charts of a dashboard: cached results now, misses in one job"""
+    from marshmallow import ValidationError
+    from superset import is_feature_enabled
+    from superset.async_events.async_query_manager import AsyncQueryTokenException
+    from superset.charts.schemas import ChartDataQueryContextSchema
+    from superset.commands.chart.data.get_data_command import ChartDataCommand
+    from superset.commands.dashboard.exceptions import (
+        DashboardAccessDeniedError,
+        DashboardNotFoundError,
+    )
+    from superset.daos.dashboard import DashboardDAO
+    from superset.extensions import async_query_manager
+    from superset.utils.core import get_user_id
+
+    from hooks.cache_keys import canonicalize_query_context, record_cache_probes
+    from hooks.tasks import load_charts_batch
+
+    config = current_app.config
+    user_id = get_user_id()
+    if user_id is None:
+        return _error(401, "Not authenticated")
+    if not is_feature_enabled("GLOBAL_ASYNC_QUERIES"):
+        return _error(400, "Batched chart data requires GLOBAL_ASYNC_QUERIES")
+
+    try:
+        DashboardDAO.get_by_id_or_slug(str(dashboard_id))
+    except DashboardNotFoundError:
+        return _error(404, "Dashboard not found")
+    except DashboardAccessDeniedError:
+        return _error(403, "Forbidden")
+
+    try:
+        channel_id = async_query_manager.parse_channel_id_from_request(request)
+    except AsyncQueryTokenException:
+        return _error(401, "Invalid async query token")
+
+    charts = (request.get_json(silent=True) or {}).get("charts")
+    max_charts = config.get("DASHBOARD_BATCH_MAX_CHARTS", DEFAULT_MAX_CHARTS)
+    if not isinstance(charts, list) or not charts:
+        return _error(400, "Request needs a non-empty 'charts' list")
+    if len(charts) > max_charts:
+        return _error(400, f"At most {max_charts} charts per request")
+
+    # Validate (access checks included) and collect the cache keys to probe
+    lines, commands, keys = [], {}, {}
+    canonicalized = set()
+    for index, chart in enumerate(charts):
+        try:
+            query_context = ChartDataQueryContextSchema().load(chart)
+            command = ChartDataCommand(query_context)
+            command.validate()
+        except (ValidationError, KeyError) as e:
+            lines.append({"index": index, "slice_id": _slice_id(chart), "status": "error",
+                          "errors": [{"message": f"Request is incorrect: {e}"}]})
+            continue
+        except Exception as e:
+            lines.append({"index": index, "slice_id": _slice_id(chart), "status": "error",
+                          "errors": [{"message": str(e)}]})
+            continue
+
+        commands[index] = command
+        if query_context.force:
+            continue
+        if canonicalize_query_context(query_context):
+            canonicalized.add(index)
+        with_keys = _cache_keys(query_context)
+        if with_keys:
+            keys[index] = with_keys
+
+    found = probe_data_cache([key for chart_keys in keys.values() for key in chart_keys])
+    hits = [index for index, chart_keys in keys.items() if all(k in found for k in chart_keys)]
+    misses = [index for index in commands if index not in hits]
+    record_cache_probes(len(keys), len(hits), len(canonicalized.intersection(hits)))
+
+    # Start computing the misses before streaming anything
+    pending = {}
+    jobs = []
+    for index in misses:
+        job_metadata = async_query_manager.init_job(channel_id, user_id)
+        pending[job_metadata["job_id"]] = index
+        jobs.append([job_metadata, charts[index]])
+        lines.append({"index": index, "slice_id": _slice_id(charts[index]),
+                      "status": "pending", "job": job_metadata})
+    concurrency = dashboard_concurrency(dashboard_id, config)
+    timeout = config.get("DASHBOARD_BATCH_STREAM_TIMEOUT_SECONDS", DEFAULT_STREAM_TIMEOUT_SECONDS)
+    if jobs:
+        # Charts that can't start before the stream ends fail, not queue
+        load_charts_batch.delay(dashboard_id, jobs, concurrency, time.time() + timeout)
+
+    print(f"[Dashboard Batch] Dashboard {dashboard_id}: {len(charts)} chart(s), "
+          f"{len(hits)} cached, {len(jobs)} queued (concurrency {concurrency})")
+
+    poll_interval = config.get("DASHBOARD_BATCH_POLL_INTERVAL_SECONDS", DEFAULT_POLL_INTERVAL_SECONDS)
+
+    def generate():
+        from superset.commands.chart.exceptions import ChartDataCacheLoadError
+        from superset.utils import json
+
+        def line(payload):
+            return json.dumps(payload, default=json.json_int_dttm_ser, ignore_nan=True) + "\n"
+
+        for payload in lines:
+            yield line(payload)
+
+        for index in hits:
+            try:
+                result = commands[index].run(force_cached=True)
+            except ChartDataCacheLoadError:
+                # Expired since the probe: falls back to its own job
+                job_metadata = async_query_manager.submit_chart_data_job(
+                    channel_id, charts[index], user_id
+                )
+                pending[job_metadata["job_id"]] = index
+                yield line({"index": index, "slice_id": _slice_id(charts[index]),
+                            "status": "pending", "job": job_metadata})
+                continue
+            yield line({"index": index, "slice_id": _slice_id(charts[index]),
+                        "status": "cached", "result": result["queries"]})
+
+        # Relay completions from the async event stream of this channel
+        last_id = None
+        deadline = time.monotonic() + timeout
+        while pending and time.monotonic() < deadline:
+            events = [e for e in async_query_manager.read_events(channel_id, last_id) if e]
+            for event in events:
+                last_id = event["id"]
+                index = pending.get(event.get("job_id"))
+                if index is None or event.get("status") not in (
+                    async_query_manager.STATUS_DONE,
+                    async_query_manager.STATUS_ERROR,
+                ):
+                    continue
+                del pending[event["job_id"]]
+                payload = {"index": index, "slice_id": _slice_id(charts[index]),
+                           "status": event["status"]}
+                if event["status"] == async_query_manager.STATUS_DONE:
+                    payload["result_url"] = event.get("result_url")
+                else:
+                    payload["errors"] = event.get("errors") or []
+                yield line(payload)
+            if not events:
+                time.sleep(poll_interval)
+
+        if pending:
+            yield line({"status": "timeout", "pending": sorted(pending.values())})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        # nginx: forward each line as soon as it is written
+        headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"},
+    )
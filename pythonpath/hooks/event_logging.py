@@ -0,0 +1,232 @@
+"""
+Buffered event logging for Superset's logs table
+
+DBEventLogger writes (and commits) one row per chart view / API call /
+query in the request path, on the same Postgres (pg1616) that holds the
+Iceberg catalog. BufferedDBEventLogger keeps events in process and writes
+them with one multi-row INSERT when LOGS_BUFFER_SIZE events are queued or
+every LOGS_FLUSH_INTERVAL_SECONDS, on its own connection.
+
+prune_logs deletes (and optionally rolls up into logs_rollup) rows older
+than the retention period in bounded batches, each in a short transaction,
+so it never holds long locks on the table.
+
+logs_rollup is not part of Superset's schema: it is created by the first
+prune with CREATE TABLE IF NOT EXISTS (no Alembic migration), so
+`superset db upgrade/downgrade` doesn't know about it. Schema changes to it
+have to be applied by hand.
+
+Shared between web server and Celery workers.
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import create_engine, text
+from superset.utils import json
+from superset.utils.log import DBEventLogger
+
+
+class BufferedDBEventLogger(DBEventLogger):
+    """DBEventLogger that flushes rows in bulk on size or time triggers"""
+
+    def __init__(
+        self,
+        database_uri: Optional[str],
+        buffer_size: int = 500,
+        flush_interval: float = 5.0,
+    ) -> None:
+        super().__init__()
+        self.database_uri = database_uri
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._engine = None
+        self._pid = None
+        atexit.register(self.flush)
+        # Prefork children (recycled by worker_max_memory_per_child, too)
+        # end with os._exit, which skips atexit
+        try:
+            from celery.signals import worker_process_shutdown
+            worker_process_shutdown.connect(
+                self._flush_on_shutdown, weak=False, dispatch_uid="event-log-flush"
+            )
+        except ImportError:
+            pass
+
+    def _flush_on_shutdown(self, **kwargs: Any) -> None:
+        self.flush()
+
+    def _ensure_flusher(self) -> None:
+        """Start the time-trigger thread (again after a gunicorn/celery fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._init_lock:
+            if self._pid == os.getpid():
+                return
+            # Rows buffered before the fork belong to the parent
+            self._buffer = []
+            self._lock = threading.Lock()
+            self._engine = None
+            threading.Thread(
+                target=self._flush_loop, name="event-log-flusher", daemon=True
+            ).start()
+            self._pid = os.getpid()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def log(  # pylint: disable=too-many-arguments
+        self,
+        user_id: Optional[int],
+        action: str,
+        dashboard_id: Optional[int],
+        duration_ms: Optional[int],
+        slice_id: Optional[int],
+        referrer: Optional[str],
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        rows = []
+        dttm = datetime.now()
+        for record in kwargs.get("records", []):
+            try:
+                json_string = json.dumps(record)
+            except Exception:
+                json_string = None
+            # Same as DBEventLogger: frontend events carry the IDs per record
+            rows.append({
+                "action": action,
+                "json": json_string,
+                "dashboard_id": dashboard_id or record.get("dashboard_id"),
+                "slice_id": slice_id or record.get("slice_id"),
+                "duration_ms": duration_ms,
+                "referrer": referrer,
+                "user_id": user_id,
+                "dttm": dttm,
+            })
+        if not rows:
+            return
+
+        self._ensure_flusher()
+        with self._lock:
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows with one multi-row INSERT"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+
+        try:
+            from superset.models.core import Log
+
+            if self._engine is None:
+                self._engine = create_engine(self.database_uri, pool_size=1, max_overflow=1)
+            with self._engine.begin() as conn:
+                conn.execute(Log.__table__.insert().values(rows))
+        except Exception as e:
+            # Same policy as DBEventLogger: logging must never fail requests
+            print(f"[Event Log] Failed to flush {len(rows)} event(s): {e}")
+
+
+_ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS logs_rollup (
+    day DATE NOT NULL,
+    action VARCHAR(512) NOT NULL,
+    user_id INTEGER NOT NULL,
+    dashboard_id INTEGER NOT NULL,
+    slice_id INTEGER NOT NULL,
+    events BIGINT NOT NULL,
+    duration_ms BIGINT NOT NULL,
+    PRIMARY KEY (day, action, user_id, dashboard_id, slice_id)
+)
+"""
+
+_BATCH_CTE = """
+WITH batch AS (
+    DELETE FROM logs
+    WHERE id IN (
+        SELECT id FROM logs
+        WHERE dttm < :cutoff
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING dttm, action, user_id, dashboard_id, slice_id, duration_ms
+)
+"""
+
+_DELETE_BATCH = _BATCH_CTE + "SELECT COUNT(*) FROM batch"
+
+_ROLLUP_BATCH = _BATCH_CTE + """
+, rolled AS (
+    INSERT INTO logs_rollup (day, action, user_id, dashboard_id, slice_id, events, duration_ms)
+    SELECT CAST(dttm AS DATE), COALESCE(action, ''), COALESCE(user_id, 0),
+           COALESCE(dashboard_id, 0), COALESCE(slice_id, 0),
+           COUNT(*), COALESCE(SUM(duration_ms), 0)
+    FROM batch
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT (day, action, user_id, dashboard_id, slice_id) DO UPDATE
+    SET events = logs_rollup.events + EXCLUDED.events,
+        duration_ms = logs_rollup.duration_ms + EXCLUDED.duration_ms
+)
+SELECT COUNT(*) FROM batch
+"""
+
+
+def prune_logs(
+    engine: Any,
+    retention_days: int,
+    batch_size: int,
+    max_batches: int,
+    rollup: bool = True,
+    pause_seconds: float = 0.1,
+) -> int:
+    """
+    Delete logs rows older than the retention period in bounded batches
+
+    Args:
+        engine: SQLAlchemy engine of the Superset metadata DB (Postgres)
+        retention_days: Rows older than this are pruned
+        batch_size: Rows deleted per transaction
+        max_batches: Upper bound of batches per run (rest: next run)
+        rollup: Aggregate pruned rows into logs_rollup (per day, action,
+                user, dashboard, chart) in the same transaction
+        pause_seconds: Pause between batches to let other writers through
+
+    Returns:
+        int: Number of rows pruned
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    statement = text(_ROLLUP_BATCH if rollup else _DELETE_BATCH)
+
+    if rollup:
+        with engine.begin() as conn:
+            conn.execute(text(_ROLLUP_DDL))
+
+    pruned = 0
+    for _ in range(max_batches):
+        with engine.begin() as conn:
+            deleted = conn.execute(
+                statement, {"cutoff": cutoff, "batch_size": batch_size}
+            ).scalar() or 0
+        pruned += deleted
+        if deleted < batch_size:
+            break
+        time.sleep(pause_seconds)
+
+    print(f"[Event Log] Pruned {pruned} log row(s) older than {cutoff:%Y-%m-%d %H:%M}")
+    return pruned
@@ -1,16 +1,20 @@
 """
 User quota management logic
 
+Usage is measured, not estimated: Trino's HTTP event listener feeds
+per-user counters in Redis (see hooks.trino_usage / trino_event_receiver.py).
+Usage, query cost and limit are all Trino CPU seconds.
+
 Future implementations:
 - BigQuery quota check via API
-- Redis-based quota tracking
 - Per-user/per-project quota limits
 """
 
 import redis
-from datetime import datetime
 from superset.exceptions import SupersetException
 
+from hooks.trino_usage import get_user_usage
+
 
 class UserQuotaExceeded(SupersetException):
     """Raised when user exceeds their quota limit"""
@@ -18,13 +22,8 @@ class UserQuotaExceeded(SupersetException):
     error_type = "USER_QUOTA_EXCEEDED"
 
 
-# Redis client for quota tracking (uncomment when implementing)
-# QUOTA_REDIS = redis.Redis(
-#     host='redis',
-#     port=6379,
-#     db=3,
-#     decode_responses=True
-# )
+DEFAULT_QUERY_CPU_SECONDS = 60
+DEFAULT_DAILY_CPU_SECONDS = 3600
 
 
 def calculate_query_cost(user_email: str, sql: str) -> int:
@@ -34,15 +33,16 @@ def calculate_query_cost(user_email: str, sql: str) -> int:
         sql: SQL query string
 
     Returns:
-        Cost value (arbitrary units)
+        Trino CPU seconds reserved for the query before it runs
+        (SQLLAB_QUOTA_QUERY_CPU_SECONDS), same unit as the measured usage
 
-    TODO: Implement actual cost calculation based on:
-        - Query complexity (JOIN count, subqueries, etc.)
-        - Table size estimation
+    TODO: Estimate per query from:
+        - EXPLAIN (TYPE IO) / table stats
         - BigQuery dry run API for accurate cost estimation
     """
-    # Placeholder implementation
-    return 90
+    from flask import current_app
+
+    return int(current_app.config.get("SQLLAB_QUOTA_QUERY_CPU_SECONDS", DEFAULT_QUERY_CPU_SECONDS))
 
 
 def get_user_quota_limit(user_email: str) -> int:
@@ -51,15 +51,15 @@ def get_user_quota_limit(user_email: str) -> int:
         user_email: User's email address
 
     Returns:
-        Quota limit (same units as cost)
+        Daily quota limit in Trino CPU seconds (SQLLAB_QUOTA_DAILY_CPU_SECONDS)
 
     TODO: Implement user-specific limits from:
         - Database configuration table
         - LDAP/AD groups
-        - Environment variables
     """
-    # Placeholder implementation
-    return 1000
+    from flask import current_app
+
+    return int(current_app.config.get("SQLLAB_QUOTA_DAILY_CPU_SECONDS", DEFAULT_DAILY_CPU_SECONDS))
 
 
 def get_user_quota_usage(user_email: str) -> int:
@@ -68,16 +68,15 @@ def get_user_quota_usage(user_email: str) -> int:
         user_email: User's email address
 
     Returns:
-        Current usage for today
-
-    TODO: Implement Redis-based tracking:
-        today = datetime.now().strftime("%Y-%m-%d")
-        key = f"quota_usage:{user_email}:{today}"
-        usage = QUOTA_REDIS.get(key)
-        return int(usage) if usage else 0
+        Current usage for today: Trino CPU seconds measured from
+        QueryCompletedEvents (hooks.trino_usage)
     """
-    # Placeholder implementation
-    return 55
+    try:
+        return get_user_usage(user_email)["cpu_ms"] // 1000
+    except redis.RedisError as e:
+        # Don't block queries when accounting is unavailable
+        print(f"[Quota] Could not read usage for {user_email}: {e}")
+        return 0
 
 
 def record_quota_usage(query_id: int, user_email: str, sql: str, cost: int) -> None:
@@ -88,18 +87,10 @@ def record_quota_usage(query_id: int, user_email: str, sql: str, cost: int) -> N
         sql: SQL query string
         cost: Cost to record
 
-    TODO: Implement Redis-based recording:
-        today = datetime.now().strftime("%Y-%m-%d")
-        key = f"quota_usage:{user_email}:{today}"
-        QUOTA_REDIS.incrby(key, cost)
-        QUOTA_REDIS.expire(key, 86400 * 7)
-
-        # 记录历史
-        history_key = f"quota_history:{user_email}:{today}"
-        QUOTA_REDIS.rpush(history_key, f"{datetime.now().isoformat()}|{cost}|{sql[:100]}")
-        QUOTA_REDIS.expire(history_key, 86400 * 7)
+    Nothing to record: actual consumption (CPU seconds) is recorded by the
+    Trino event receiver once the query completes (hooks.trino_usage), and
+    counting the reservation here as well would charge the query twice.
     """
-    # Placeholder implementation
     pass
 
 
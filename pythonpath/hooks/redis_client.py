@@ -0,0 +1,34 @@
+"""
+Shared Redis clients for hooks
+
+One connection pool per Redis DB, created on first use so that importing
+a hook module never opens a connection.
+
+Shared between web server, Celery workers and the Trino event receiver.
+"""
+
+import os
+
+import redis
+
+_clients = {}
+
+
+def get_redis(db: int) -> redis.Redis:
+    """
+    Args:
+        db: Redis DB number
+
+    Returns:
+        redis.Redis: Client bound to a process-wide connection pool
+    """
+    client = _clients.get(db)
+    if client is None:
+        client = redis.Redis(
+            host=os.environ.get("REDIS_HOST", "redis"),
+            port=int(os.environ.get("REDIS_PORT", 6379)),
+            db=db,
+            decode_responses=True,
+        )
+        _clients[db] = client
+    return client
@@ -0,0 +1,208 @@
+"""
+Hook registry
+
+Hooks are declared by name with the module they patch (target) and the
+function that installs them. Which hooks run is decided per process type
+(web / worker / worker_io / beat):
+- HOOKS_ENABLED in superset config: {"web": [...], "worker": [...], ...}
+- SUPERSET_HOOKS env (comma separated names) overrides the config list
+- SUPERSET_PROCESS_TYPE env overrides the process type passed by the
+  FLASK_APP_MUTATOR (superset-beat shares the worker config)
+
+Installation is lazy: if the target module is not imported yet, the hook
+is installed right after its first import, so disabled or unused hooks
+never import their (heavy) Superset modules. Each hook reports its import
+and install time.
+
+Shared between web server and Celery workers.
+"""
+
+import importlib
+import importlib.abc
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass(frozen=True)
+class HookSpec:
+    """A named monkeypatch and the module it patches"""
+    name: str
+    # Module whose first import triggers installation (None: install at boot)
+    target: Optional[str]
+    # "module:function" called (without arguments) to install the hook
+    installer: str
+
+
+HOOKS = [
+    HookSpec(
+        name="chart_force_refresh",
+        target="superset.charts.data.api",
+        installer="hooks.chart_hooks:install_chart_force_refresh_fix",
+    ),
+    HookSpec(
+        name="chart_cache_canonical",
+        target="superset.common.query_context_factory",
+        installer="hooks.chart_hooks:install_chart_cache_canonicalization",
+    ),
+    HookSpec(
+        name="chart_cache_index",
+        target="superset.common.query_context_processor",
+        installer="hooks.chart_hooks:install_chart_cache_index",
+    ),
+    HookSpec(
+        name="chart_debug_logging",
+        target="superset.commands.chart.data.create_async_job_command",
+        installer="hooks.chart_hooks:install_chart_debug_logging",
+    ),
+    HookSpec(
+        name="trino_http_pool",
+        target="trino.dbapi",
+        installer="hooks.trino_hooks:install_trino_http_pool",
+    ),
+    HookSpec(
+        name="alert_change_gate",
+        target="superset.commands.report.alert",
+        installer="hooks.alert_hooks:install_alert_change_gate",
+    ),
+    HookSpec(
+        name="sqllab_quota",
+        target="superset.commands.sql_lab.execute",
+        installer="hooks.sqllab_hooks:install_sqllab_quota_hook",
+    ),
+    HookSpec(
+        name="task_profiling",
+        target="celery.signals",
+        installer="hooks.report_hooks:install_task_profiling",
+    ),
+]
+
+HOOKS_BY_NAME = {spec.name: spec for spec in HOOKS}
+
+# name -> {"import_ms", "install_ms"} (or {"error"}) for installed hooks
+HOOK_TIMINGS = {}
+
+# target module -> hooks waiting for its first import
+_pending = {}
+
+
+def enabled_hooks(process_type: str, config: Optional[Any] = None) -> list:
+    """
+    Args:
+        process_type: web / worker / worker_io / beat
+        config: Superset config (reads HOOKS_ENABLED)
+
+    Returns:
+        list: Names of hooks enabled for this process type
+    """
+    env_hooks = os.environ.get("SUPERSET_HOOKS")
+    if env_hooks is not None:
+        return [name.strip() for name in env_hooks.split(",") if name.strip()]
+
+    hooks_enabled = (config or {}).get("HOOKS_ENABLED") or {}
+    return list(hooks_enabled.get(process_type, []))
+
+
+def install_hooks(process_type: str, config: Optional[Any] = None) -> None:
+    """
+    Install (or defer until first import of their target) enabled hooks
+
+    Args:
+        process_type: Default process type, SUPERSET_PROCESS_TYPE env wins
+        config: Superset config (reads HOOKS_ENABLED)
+    """
+    process_type = os.environ.get("SUPERSET_PROCESS_TYPE", process_type)
+    names = enabled_hooks(process_type, config)
+    print(f"[Hooks] Process type: {process_type}, enabled: {', '.join(names) or '-'}")
+
+    for name in names:
+        spec = HOOKS_BY_NAME.get(name)
+        if spec is None:
+            print(f"[Hooks] Unknown hook '{name}', skipped")
+            continue
+
+        if spec.target is None or spec.target in sys.modules:
+            _install(spec)
+        else:
+            _pending.setdefault(spec.target, []).append(spec)
+            print(f"[Hooks] {spec.name}: deferred until import of {spec.target}")
+
+    if _pending and not any(isinstance(f, _PostImportFinder) for f in sys.meta_path):
+        sys.meta_path.insert(0, _PostImportFinder())
+
+
+def _install(spec: HookSpec) -> None:
+    """Import the installer module and run the installer, timing both"""
+    if spec.name in HOOK_TIMINGS:
+        return
+
+    module_name, func_name = spec.installer.split(":")
+    try:
+        start = time.perf_counter()
+        installer = getattr(importlib.import_module(module_name), func_name)
+        imported = time.perf_counter()
+        installer()
+        installed = time.perf_counter()
+    except Exception as e:
+        # A broken hook must not break the import of the module it patches
+        HOOK_TIMINGS[spec.name] = {"error": str(e)}
+        print(f"[Hooks] Error installing {spec.name}: {e}")
+        import traceback
+        traceback.print_exc()
+        return
+
+    HOOK_TIMINGS[spec.name] = {
+        "import_ms": (imported - start) * 1000,
+        "install_ms": (installed - imported) * 1000,
+    }
+    print(
+        f"[Hooks] {spec.name}: import {HOOK_TIMINGS[spec.name]['import_ms']:.1f}ms, "
+        f"install {HOOK_TIMINGS[spec.name]['install_ms']:.1f}ms"
+    )
+
+
+def _run_pending(fullname: str) -> None:
+    """Install hooks waiting for `fullname`, called once it is imported"""
+    for spec in _pending.pop(fullname, []):
+        _install(spec)
+
+    if not _pending:
+        sys.meta_path[:] = [f for f in sys.meta_path if not isinstance(f, _PostImportFinder)]
+
+
+class _PostImportFinder(importlib.abc.MetaPathFinder):
+    """Wraps the loader of pending target modules to run hooks after import"""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in _pending:
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None:
+                    spec.loader = _PostImportLoader(spec.loader, fullname)
+                return spec
+        return None
+
+
+class _PostImportLoader(importlib.abc.Loader):
+    """Delegating loader that installs pending hooks after exec_module"""
+
+    def __init__(self, loader, fullname):
+        self._loader = loader
+        self._fullname = fullname
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        _run_pending(self._fullname)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
@@ -4,6 +4,7 @@ Report and Alert execution hooks (Worker-side)
 Hooks into report/alert execution to add:
 - Debug logging for report execution
 - Owner and content information tracking
+- Per-task memory / CPU profiling (task_profiling hook, hooks.task_profiling)
 - Future: Per-user quota checking for reports
 """
 
@@ -16,6 +17,9 @@ from celery.signals import task_prerun, task_postrun
 # Import shared SQL logging utilities
 from hooks.sql_logging import set_chart_cache_context, cleanup_thread_local
 
+# Set by install_task_profiling()
+_profiling_enabled = False
+
 # def install_report_execution_logging():
 #     """
 #     Install debug logging for report execution
@@ -59,7 +63,6 @@ from hooks.sql_logging import set_chart_cache_context, cleanup_thread_local
 #     print("✓ Worker: Hooked AsyncExecuteReportScheduleCommand.run successfully")
 
 
-@task_prerun.connect
 def check_quota_before_celery_task(task_id=None, task=None, args=None, kwargs=None, **extra):
     """
     Pre-execution check for Celery tasks
@@ -72,6 +75,10 @@ def check_quota_before_celery_task(task_id=None, task=None, args=None, kwargs=No
 
         print(f"[Worker Task] Running task: {task.name}")
 
+        if _profiling_enabled:
+            from hooks.task_profiling import start_task
+            start_task(task_id)
+
         # Handle reports.execute
         if task.name == 'reports.execute':
             print("[Report Execute Debug] ========== reports.execute starting ==========")
@@ -108,11 +115,13 @@ def check_quota_before_celery_task(task_id=None, task=None, args=None, kwargs=No
         traceback.print_exc()
         cleanup_thread_local()
 
-@task_postrun.connect
-def cleanup_after_task(task_id=None, task=None, **kwargs):
+def cleanup_after_task(task_id=None, task=None, args=None, kwargs=None, **extra):
     """
     Clean up thread-local variables after task execution
     """
+    if _profiling_enabled and task:
+        record_task_profile(task_id, task, args, kwargs)
+
     try:
         if task and task.name == 'load_chart_data_into_cache':
             print(f"[Chart Cache] ========== Chart cache task completed ==========")
@@ -122,9 +131,57 @@ def cleanup_after_task(task_id=None, task=None, **kwargs):
         import traceback
         traceback.print_exc()
 
-# def install_report_hooks():
-#     """Install all report-related hooks (Worker-side only)"""
-#     # install_report_execution_logging()
-#     # install_celery_task_prerun_hook()
-#     # install_chart_data_logging()
-#     print("=== Worker: All report hooks installed ===")
+
+def record_task_profile(task_id, task, args, kwargs):
+    """Record the task's profile and warn when the process will be recycled"""
+    try:
+        from hooks.task_profiling import finish_task
+
+        profile = finish_task(task_id, task.name, args, kwargs)
+        if profile is None:
+            return
+
+        print(
+            f"[Task Profile] {task.name}: rss_delta={profile['rss_delta_kb']}KB "
+            f"peak={profile['peak_kb'] if profile['peak_kb'] is not None else '-'}KB "
+            f"cpu={profile['cpu_ms']}ms duration={profile['duration_ms']}ms"
+        )
+
+        # Same threshold Celery uses to replace prefork children
+        max_memory_kb = task.app.conf.worker_max_memory_per_child
+        if max_memory_kb and profile["rss_kb"] > max_memory_kb:
+            print(
+                f"[Task Profile] WARNING: RSS {profile['rss_kb'] // 1024}MB over "
+                f"{max_memory_kb // 1024}MB after {task.name} "
+                f"(chart={profile['chart_id']}, report={profile['report_id']}), "
+                f"process will be recycled"
+            )
+    except Exception as e:
+        print(f"[Task Profile] Error recording profile: {e}")
+
+
+def install_report_hooks():
+    """Connect the task_prerun / task_postrun handlers (Worker-side only)"""
+    # weak=False: handlers must outlive references to this module,
+    # dispatch_uid: installing twice doesn't run them twice
+    task_prerun.connect(
+        check_quota_before_celery_task, weak=False, dispatch_uid="hooks.report_hooks.prerun"
+    )
+    task_postrun.connect(
+        cleanup_after_task, weak=False, dispatch_uid="hooks.report_hooks.postrun"
+    )
+    print("✓ Report hooks installed (task_prerun, task_postrun)")
+
+
+def install_task_profiling():
+    """
+    Profile memory and CPU of every Celery task
+
+    Records RSS delta, sampled tracemalloc peak, thread CPU time and
+    duration per task from the task_prerun / task_postrun handlers.
+    """
+    global _profiling_enabled
+
+    _profiling_enabled = True
+    install_report_hooks()
+    print("✓ Task profiling installed (task_prerun, task_postrun)")
@@ -2,25 +2,26 @@
 SQL Query Logging & Monitoring
 
 This module provides hooks for logging SQL queries before execution,
-including user information and database context.
+including user information and database context, and applies the
+SQL Lab sampling mode ("-- @sample", hooks.sqllab_sampling).
 
 Shared between web server and Celery workers.
 """
 
-# import threading
+import threading
 from typing import Any
 
 # Thread-local storage for sharing data between Celery hooks and SQL_QUERY_MUTATOR
-# _thread_local = threading.local()
+_thread_local = threading.local()
 
-# def cleanup_thread_local():
-#     """Clean up all thread-local variables"""
-#     for attr in ['in_chart_cache_task', 'chart_user_id', 'chart_id', 'datasource']:
-#         if hasattr(_thread_local, attr):
-#             try:
-#                 delattr(_thread_local, attr)
-#             except Exception:
-#                 pass
+def cleanup_thread_local():
+    """Clean up all thread-local variables"""
+    for attr in ['in_chart_cache_task', 'chart_user_id', 'chart_id', 'datasource']:
+        if hasattr(_thread_local, attr):
+            try:
+                delattr(_thread_local, attr)
+            except Exception:
+                pass
 
 def sql_query_mutator(sql: str, **kwargs: Any) -> str:
     """
@@ -38,6 +39,7 @@ def sql_query_mutator(sql: str, **kwargs: Any) -> str:
         user_email = None
         user_name = None
         flask_username = None
+        dashboard_id = None
 
         try:
             from flask import g
@@ -49,6 +51,16 @@ def sql_query_mutator(sql: str, **kwargs: Any) -> str:
         except Exception as e:
             print(f"[SQL Execution] Could not get user from g.user: {e}")
 
+        # Chart queries carry their dashboard in form_data (set_form_data)
+        try:
+            from flask import g
+            form_data = getattr(g, 'form_data', None) or {}
+            dashboard_id = form_data.get('dashboardId') or (
+                form_data.get('form_data') or {}
+            ).get('dashboardId')
+        except Exception:
+            pass
+
         if not flask_username:
             try:
                 from superset.utils.core import get_username
@@ -61,6 +73,14 @@ def sql_query_mutator(sql: str, **kwargs: Any) -> str:
         database = kwargs.get('database')
         db_backend = database.backend if database else 'Unknown'
 
+        # "-- @sample" queries read a TABLESAMPLE of their largest table
+        try:
+            from flask import current_app
+            from hooks.sqllab_sampling import apply_sampling
+            sql = apply_sampling(sql, database, current_app.config)
+        except Exception as e:
+            print(f"[SQL Sampling] Error sampling query, running it unchanged: {e}")
+
         print(f"[SQL Execution] ========================================")
         print(f"[SQL Execution] BEFORE SQL EXECUTION")
         print(f"[SQL Execution] ========================================")
@@ -68,11 +88,15 @@ def sql_query_mutator(sql: str, **kwargs: Any) -> str:
         print(f"[SQL Execution] User Email: {user_email}")
         print(f"[SQL Execution] Username: {user_name or flask_username}")
         print(f"[SQL Execution] DB Engine: {db_backend}")
+        print(f"[SQL Execution] Dashboard ID: {dashboard_id}")
         print(f"[SQL Execution] ----------------------------------------")
         print(f"[SQL Execution] SQL Query:")
         print(f"{sql}")
         print(f"[SQL Execution] ========================================")
 
+        # Parsed back by hooks.trino_usage for per-user/per-dashboard accounting
+        if dashboard_id:
+            sql = f"--dashboard: {dashboard_id}\n{sql}"
         sql = f"--run: {user_email}\n{sql}"
 
     except Exception as e:
@@ -82,20 +106,20 @@ def sql_query_mutator(sql: str, **kwargs: Any) -> str:
     return sql
 
 
-# def set_chart_cache_context(user_id: Any, chart_id: Any, datasource: Any):
-#     """
-#     Set thread-local context for chart cache queries
-
-#     Args:
-#         user_id: User ID from job_metadata
-#         chart_id: Chart/slice ID from form_data
-#         datasource: Datasource identifier from form_data
-#     """
-#     try:
-#         _thread_local.in_chart_cache_task = True
-#         _thread_local.chart_user_id = user_id
-#         _thread_local.chart_id = chart_id
-#         _thread_local.datasource = datasource
-#     except Exception as e:
-#         print(f"[SQL Logging] Error setting context: {e}")
-#         cleanup_thread_local()
+def set_chart_cache_context(user_id: Any, chart_id: Any, datasource: Any):
+    """
+    Set thread-local context for chart cache queries
+
+    Args:
+        user_id: User ID from job_metadata
+        chart_id: Chart/slice ID from form_data
+        datasource: Datasource identifier from form_data
+    """
+    try:
+        _thread_local.in_chart_cache_task = True
+        _thread_local.chart_user_id = user_id
+        _thread_local.chart_id = chart_id
+        _thread_local.datasource = datasource
+    except Exception as e:
+        print(f"[SQL Logging] Error setting context: {e}")
+        cleanup_thread_local()
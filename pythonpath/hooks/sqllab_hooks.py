@@ -8,15 +8,6 @@ Hooks into SQL Lab query execution to add:
 
 from functools import wraps
 from flask import g
-from superset.commands.sql_lab.execute import ExecuteSqlCommand
-
-from hooks.quota import (
-    UserQuotaExceeded,
-    calculate_query_cost,
-    get_user_quota_usage,
-    get_user_quota_limit,
-    record_quota_usage,
-)
 
 
 def install_sqllab_quota_hook():
@@ -26,6 +17,16 @@ def install_sqllab_quota_hook():
     This hooks into ExecuteSqlCommand.run() to check user quota
     before submitting queries to Celery workers.
     """
+    from superset.commands.sql_lab.execute import ExecuteSqlCommand
+
+    from hooks.quota import (
+        UserQuotaExceeded,
+        calculate_query_cost,
+        get_user_quota_usage,
+        get_user_quota_limit,
+        record_quota_usage,
+    )
+
     original_run = ExecuteSqlCommand.run
 
     @wraps(original_run)
@@ -48,12 +49,12 @@ def install_sqllab_quota_hook():
             quota_limit = get_user_quota_limit(user_email)
 
             print(f"[Web Quota] User: {user_email}, SQL: {sql[:100]}...")
-            print(f"[Web Quota] Usage: {current_usage}/{quota_limit}, Cost: {cost}")
+            print(f"[Web Quota] Usage: {current_usage}/{quota_limit} CPU s, Cost: {cost} CPU s")
 
             if current_usage + cost > quota_limit:
                 raise UserQuotaExceeded(
                     f"User {user_email} exceeded daily quota. "
-                    f"Used: {current_usage}, Limit: {quota_limit}, Query Cost: {cost}"
+                    f"Used: {current_usage}, Limit: {quota_limit}, Query Cost: {cost} (Trino CPU seconds)"
                 )
 
             # 3. Execute original run (creates query and submits to Celery)
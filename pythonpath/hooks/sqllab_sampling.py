@@ -0,0 +1,307 @@
+"""
+Sampling mode for exploratory SQL Lab queries (SQL_QUERY_MUTATOR)
+
+A query (or a whole SQL Lab tab, when placed at the top of the tab) opts
+in with a directive comment:
+
+    -- @sample                  rate from table statistics
+    -- @sample 5%               fixed rate
+    -- @sample bernoulli 1%     fixed method and rate
+
+The largest eligible table of the SELECT (read directly or through CTEs /
+derived tables, never inside WHERE or projection subqueries) gets
+TABLESAMPLE:
+- Rate: SQLLAB_SAMPLE_TARGET_ROWS out of the table's row_count (SHOW
+  STATS, cached in Redis), SQLLAB_SAMPLE_DEFAULT_PERCENT without stats.
+  Unqualified names resolve through the SQL Lab tab's catalog / schema
+  (the connection's defaults when run synchronously)
+- Method: SYSTEM (skips whole splits, no I/O for skipped data), or
+  BERNOULLI (row level, more accurate, but reads every row) for tables
+  known to have fewer than SQLLAB_SAMPLE_SYSTEM_MIN_ROWS rows
+
+Results are labeled with a "__sample" column (e.g. "2.5% SYSTEM of
+iceberg.demo.orders"), and COUNT / SUM columns of the outer SELECT get a
+scaled "<name>_est" estimate when the sampled table is read directly.
+
+Trino only, one SELECT statement only (a multi-statement script runs
+unchanged); anything that can't be rewritten safely runs unchanged.
+"""
+
+import re
+from typing import Any, Optional
+
+from hooks.redis_client import get_redis
+
+STATS_REDIS_DB = 4
+ROW_COUNT_KEY = "sqllab_sample:row_count:{database_id}:{table}"
+ROW_COUNT_TTL_SECONDS = 3600
+UNKNOWN_ROW_COUNT_TTL_SECONDS = 300
+
+DEFAULT_TARGET_ROWS = 1_000_000
+DEFAULT_PERCENT = 1.0
+DEFAULT_MIN_PERCENT = 0.01
+DEFAULT_SYSTEM_MIN_ROWS = 50_000_000
+
+LABEL_COLUMN = "__sample"
+
+_DIRECTIVE_RE = re.compile(
+    r"(?:--|/\*)\s*@sample\b(?P<args>[^\n]*?)\s*(?:\*/|$)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_PERCENT_RE = re.compile(r"^(\d+(?:\.\d+)?)%?$")
+_METHODS = {"system": "SYSTEM", "bernoulli": "BERNOULLI"}
+
+
+def parse_directive(sql: str) -> Optional[dict]:
+    """
+    Args:
+        sql: SQL as typed in SQL Lab
+
+    Returns:
+        dict: {"method": SYSTEM / BERNOULLI / None, "percent": float / None},
+              None if the query doesn't opt in
+    """
+    match = _DIRECTIVE_RE.search(sql)
+    if not match:
+        return None
+
+    directive = {"method": None, "percent": None}
+    for token in match.group("args").split():
+        if token.lower() in _METHODS:
+            directive["method"] = _METHODS[token.lower()]
+        elif _PERCENT_RE.match(token):
+            directive["percent"] = float(_PERCENT_RE.match(token).group(1))
+    return directive
+
+
+def _query_namespace(database: Any) -> tuple:
+    """
+    Catalog and schema unqualified names resolve to
+
+    SQL Lab runs the tab's query in sql_lab.get_sql_results (query_id is its
+    first argument): its Query carries the tab's catalog / schema. Otherwise
+    (synchronous execution) the connection's defaults apply.
+
+    Returns:
+        tuple: (catalog, schema), either None if unknown
+    """
+    from hooks.iceberg_catalog import default_catalog
+
+    catalog, schema = None, None
+    try:
+        from celery import current_task
+
+        if current_task and current_task.name == "sql_lab.get_sql_results":
+            from superset import db
+            from superset.models.sql_lab import Query
+
+            request = current_task.request
+            query_id = request.args[0] if request.args else (request.kwargs or {}).get("query_id")
+            query = db.session.query(Query).filter_by(id=query_id).one_or_none()
+            if query is not None:
+                catalog, schema = getattr(query, "catalog", None), query.schema
+    except Exception as e:
+        print(f"[SQL Sampling] Could not read the query's schema: {e}")
+
+    # trino://user@host:port/<catalog>/<schema>
+    url_parts = (database.url_object.database or "").split("/")
+    catalog = catalog or default_catalog(database)
+    schema = schema or (url_parts[1] if len(url_parts) > 1 else None)
+    return catalog, schema
+
+
+def _qualified_name(table: Any, catalog: Optional[str], schema: Optional[str]) -> Optional[str]:
+    """catalog.schema.table of a sqlglot Table (None if not resolvable)"""
+    from sqlglot import exp
+
+    catalog = table.catalog or catalog
+    schema = table.db or schema
+    if not catalog or not schema:
+        return None
+    return exp.table_(table.name, db=schema, catalog=catalog, quoted=True).sql(dialect="trino")
+
+
+def _table_name(table: Any) -> str:
+    return ".".join(part for part in (table.catalog, table.db, table.name) if part)
+
+
+def eligible_tables(expression: Any) -> tuple:
+    """
+    Tables whose sampling keeps the query meaningful
+
+    Returns:
+        tuple: (tables read through FROM / JOIN of the root, CTEs and derived
+                tables, the subset read directly by the outer SELECT)
+    """
+    from sqlglot import exp
+    from sqlglot.optimizer.scope import ScopeType, traverse_scope
+
+    allowed = {ScopeType.ROOT, ScopeType.CTE, ScopeType.DERIVED_TABLE}
+    tables, direct = [], []
+    for scope in traverse_scope(expression):
+        parent, ok = scope, True
+        while parent is not None:
+            ok = ok and parent.scope_type in allowed
+            parent = parent.parent
+        if not ok:
+            continue
+        for source in scope.sources.values():
+            if isinstance(source, exp.Table) and not source.args.get("sample"):
+                tables.append(source)
+                if scope.is_root:
+                    direct.append(source)
+    return tables, direct
+
+
+def table_row_count(database: Any, table: str) -> Optional[int]:
+    """
+    Args:
+        database: Superset Database the query runs on
+        table: Fully qualified (catalog.schema.table) quoted table name
+
+    Returns:
+        int: row_count from SHOW STATS (None if unavailable)
+    """
+    key = ROW_COUNT_KEY.format(database_id=database.id, table=table)
+    r = get_redis(STATS_REDIS_DB)
+    cached = r.get(key)
+    if cached is not None:
+        return int(cached) if int(cached) >= 0 else None
+
+    row_count = None
+    try:
+        df = database.get_df(f"SHOW STATS FOR {table}")
+        rows = df["row_count"].dropna()
+        if not rows.empty:
+            row_count = int(rows.max())
+    except Exception as e:
+        print(f"[SQL Sampling] No stats for {table}: {e}")
+
+    if row_count is None:
+        r.set(key, -1, ex=UNKNOWN_ROW_COUNT_TTL_SECONDS)
+    else:
+        r.set(key, row_count, ex=ROW_COUNT_TTL_SECONDS)
+    return row_count
+
+
+def choose_sample(directive: dict, row_count: Optional[int], config: Any) -> Optional[tuple]:
+    """
+    Returns:
+        tuple: (method, percent), None if the table is small enough to read fully
+    """
+    percent = directive["percent"]
+    if percent is None:
+        if row_count is None:
+            percent = config.get("SQLLAB_SAMPLE_DEFAULT_PERCENT", DEFAULT_PERCENT)
+        elif row_count > 0:
+            target_rows = config.get("SQLLAB_SAMPLE_TARGET_ROWS", DEFAULT_TARGET_ROWS)
+            percent = max(
+                target_rows * 100 / row_count,
+                config.get("SQLLAB_SAMPLE_MIN_PERCENT", DEFAULT_MIN_PERCENT),
+            )
+        else:
+            return None
+    percent = float(f"{percent:.3g}")
+    if percent <= 0 or percent >= 100:
+        return None
+
+    method = directive["method"]
+    if method is None:
+        # BERNOULLI still reads every row: only worth it on tables known to
+        # be small, where SYSTEM (whole splits) would be too coarse
+        system_min_rows = config.get("SQLLAB_SAMPLE_SYSTEM_MIN_ROWS", DEFAULT_SYSTEM_MIN_ROWS)
+        method = "BERNOULLI" if row_count is not None and row_count < system_min_rows else "SYSTEM"
+    return method, percent
+
+
+def _add_estimates(select: Any, scale: float) -> None:
+    """Append "<name>_est" = COUNT / SUM * scale for the outer projections"""
+    from sqlglot import exp
+
+    estimates = []
+    for index, projection in enumerate(select.expressions):
+        agg = projection.unalias()
+        if isinstance(agg, exp.Count) and not isinstance(agg.this, exp.Distinct):
+            name = projection.alias or "count"
+        elif isinstance(agg, exp.Sum):
+            name = projection.alias or "sum"
+        else:
+            continue
+        if not projection.alias:
+            name = f"{name}_{index}"
+        estimates.append(exp.alias_(
+            exp.Mul(this=agg.copy(), expression=exp.Literal.number(scale)),
+            f"{name}_est",
+            quoted=True,
+        ))
+    if estimates:
+        select.select(*estimates, copy=False)
+
+
+def apply_sampling(sql: str, database: Any, config: Any) -> str:
+    """
+    Rewrite a SELECT that opts in with "-- @sample" to read a sample
+
+    Args:
+        sql: SQL about to run (scripts of several statements are left as is)
+        database: Superset Database the query runs on
+        config: Superset config (SQLLAB_SAMPLE_*)
+
+    Returns:
+        str: Sampled SQL, or the SQL unchanged
+    """
+    directive = parse_directive(sql)
+    if directive is None or database is None or database.backend != "trino":
+        return sql
+
+    import sqlglot
+    from sqlglot import exp
+
+    try:
+        statements = [e for e in sqlglot.parse(sql, read="trino") if e is not None]
+    except sqlglot.errors.ParseError as e:
+        print(f"[SQL Sampling] Not sampled, can't parse: {e}")
+        return sql
+    # Re-generating a script would need every statement to round-trip
+    if len(statements) != 1 or not isinstance(statements[0], exp.Select):
+        print("[SQL Sampling] Not sampled: only single SELECT statements")
+        return sql
+    expression = statements[0]
+    if any(p.alias_or_name == LABEL_COLUMN for p in expression.expressions):
+        return sql
+
+    tables, direct = eligible_tables(expression)
+    if not tables:
+        print("[SQL Sampling] Not sampled: no table to sample")
+        return sql
+
+    # Sample the largest table only: sampling both sides of a join
+    # multiplies the error (and empties selective joins)
+    catalog, schema = _query_namespace(database)
+    names = {id(table): _qualified_name(table, catalog, schema) for table in tables}
+    row_counts = {
+        id(table): table_row_count(database, names[id(table)]) if names[id(table)] else None
+        for table in tables
+    }
+    table = max(tables, key=lambda t: row_counts[id(t)] if row_counts[id(t)] is not None else -1)
+    row_count = row_counts[id(table)]
+    name = names[id(table)] or _table_name(table)
+
+    sample = choose_sample(directive, row_count, config)
+    if sample is None:
+        print(f"[SQL Sampling] Not sampled: {name} has {row_count} rows")
+        return sql
+    method, percent = sample
+
+    table.set("sample", exp.TableSample(
+        method=exp.var(method), percent=exp.Literal.number(percent)
+    ))
+    label = f"{percent:g}% {method} of " + name.replace('"', "")
+    if any(t is table for t in direct):
+        _add_estimates(expression, 100 / percent)
+    expression.select(
+        exp.alias_(exp.Literal.string(label), LABEL_COLUMN, quoted=True), copy=False
+    )
+
+    print(f"[SQL Sampling] Sampled {label} (row_count: {row_count})")
+    return expression.sql(dialect="trino")
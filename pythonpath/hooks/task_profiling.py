@@ -0,0 +1,184 @@
+"""
+Per-task memory and CPU profiling (Worker-side)
+
+Called from the task_prerun / task_postrun signals (hooks.report_hooks)
+when the task_profiling hook is enabled. Per task it records:
+- RSS delta and RSS after the task
+- Peak Python allocation, sampled with tracemalloc
+  (TASK_PROFILING_TRACEMALLOC_RATE of tasks, one traced task at a time)
+- CPU time of the task's thread and wall duration
+
+Aggregates go to Redis per task name, and the largest memory footprint
+per chart ID / report ID is kept in sorted sets for a ranked report:
+
+    python -m hooks.task_profiling
+
+Worker processes growing beyond CELERY_MAX_MEMORY_PER_CHILD_MB are
+recycled by Celery (worker_max_memory_per_child) after their current task.
+"""
+
+import os
+import random
+import threading
+import time
+import tracemalloc
+from typing import Any, Optional
+
+from hooks.redis_client import get_redis
+
+PROFILE_REDIS_DB = 4
+PROFILE_TTL_SECONDS = 86400 * 7
+TASK_KEY = "task_profile:task:{name}"
+TASK_RANK_KEY = "task_profile:rank:task"
+CHART_RANK_KEY = "task_profile:rank:chart"
+REPORT_RANK_KEY = "task_profile:rank:report"
+
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+# task_id -> measurements taken at prerun
+_active = {}
+_tracing_lock = threading.Lock()
+_tracing_task_id = None
+
+
+def _rss_kb() -> int:
+    """Current resident set size of this process in KB (Linux)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * _PAGE_KB
+
+
+def _tracemalloc_rate() -> float:
+    return float(os.environ.get("TASK_PROFILING_TRACEMALLOC_RATE", 0.1))
+
+
+def start_task(task_id: str) -> None:
+    """Take the prerun measurements of a task"""
+    global _tracing_task_id
+
+    traced = False
+    if random.random() < _tracemalloc_rate():
+        with _tracing_lock:
+            if _tracing_task_id is None and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing_task_id = task_id
+                traced = True
+
+    _active[task_id] = {
+        "rss_kb": _rss_kb(),
+        "cpu": time.thread_time(),
+        "start": time.perf_counter(),
+        "traced": traced,
+    }
+
+
+def finish_task(task_id: str, task_name: str, args: Any, kwargs: Any) -> Optional[dict]:
+    """
+    Take the postrun measurements of a task and record them
+
+    Returns:
+        dict: Measurements of the task (None if prerun was not seen)
+    """
+    global _tracing_task_id
+
+    started = _active.pop(task_id, None)
+    if started is None:
+        return None
+
+    peak_kb = None
+    if started["traced"]:
+        with _tracing_lock:
+            peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+            _tracing_task_id = None
+
+    rss_kb = _rss_kb()
+    profile = {
+        "task": task_name,
+        "rss_kb": rss_kb,
+        "rss_delta_kb": rss_kb - started["rss_kb"],
+        "peak_kb": peak_kb,
+        "cpu_ms": int((time.thread_time() - started["cpu"]) * 1000),
+        "duration_ms": int((time.perf_counter() - started["start"]) * 1000),
+        "chart_id": _chart_id(task_name, args, kwargs),
+        "report_id": _report_id(task_name, args, kwargs),
+    }
+    _record(profile)
+    return profile
+
+
+def _chart_id(task_name: str, args: Any, kwargs: Any) -> Optional[Any]:
+    """Chart ID of load_chart_data_into_cache / load_explore_json_into_cache"""
+    if task_name not in ("load_chart_data_into_cache", "load_explore_json_into_cache"):
+        return None
+    form_data = (args[1] if args and len(args) >= 2 else (kwargs or {}).get("form_data")) or {}
+    return form_data.get("slice_id") or (form_data.get("form_data") or {}).get("slice_id")
+
+
+def _report_id(task_name: str, args: Any, kwargs: Any) -> Optional[Any]:
+    """Report schedule ID of reports.execute"""
+    if task_name != "reports.execute":
+        return None
+    return args[0] if args else (kwargs or {}).get("report_schedule_id")
+
+
+def _record(profile: dict) -> None:
+    # Memory footprint of a task: what it kept (RSS) or allocated at peak
+    memory_kb = max(profile["rss_delta_kb"], profile["peak_kb"] or 0)
+
+    key = TASK_KEY.format(name=profile["task"])
+    pipe = get_redis(PROFILE_REDIS_DB).pipeline(transaction=False)
+    pipe.hincrby(key, "count", 1)
+    pipe.hincrby(key, "rss_delta_kb", profile["rss_delta_kb"])
+    pipe.hincrby(key, "cpu_ms", profile["cpu_ms"])
+    pipe.hincrby(key, "duration_ms", profile["duration_ms"])
+    if profile["peak_kb"] is not None:
+        pipe.hincrby(key, "traced", 1)
+        pipe.hincrby(key, "peak_kb", profile["peak_kb"])
+    pipe.expire(key, PROFILE_TTL_SECONDS)
+
+    for rank_key, member in (
+        (TASK_RANK_KEY, profile["task"]),
+        (CHART_RANK_KEY, profile["chart_id"]),
+        (REPORT_RANK_KEY, profile["report_id"]),
+    ):
+        if member is not None:
+            pipe.zadd(rank_key, {str(member): memory_kb}, gt=True)
+            pipe.expire(rank_key, PROFILE_TTL_SECONDS)
+    pipe.execute()
+
+
+def memory_report(limit: int = 10) -> dict:
+    """
+    Returns:
+        dict: charts / reports / tasks -> [(id, max memory KB), ...] ranked
+              by largest footprint, and per task name aggregates
+    """
+    r = get_redis(PROFILE_REDIS_DB)
+    report = {
+        "charts": r.zrevrange(CHART_RANK_KEY, 0, limit - 1, withscores=True),
+        "reports": r.zrevrange(REPORT_RANK_KEY, 0, limit - 1, withscores=True),
+        "tasks": r.zrevrange(TASK_RANK_KEY, 0, limit - 1, withscores=True),
+    }
+    report["task_stats"] = {
+        name: r.hgetall(TASK_KEY.format(name=name)) for name, _ in report["tasks"]
+    }
+    return report
+
+
+if __name__ == "__main__":
+    # python -m hooks.task_profiling
+    report = memory_report()
+    for section in ("charts", "reports", "tasks"):
+        print(f"== Most memory-hungry {section} (max KB) ==")
+        for member, kb in report[section]:
+            print(f"  {member:<40} {int(kb):>12}")
+    print("== Per task (avg) ==")
+    for name, stats in report["task_stats"].items():
+        count = int(stats.get("count", 0)) or 1
+        traced = int(stats.get("traced", 0))
+        peak = f"{int(stats['peak_kb']) // traced}KB" if traced else "-"
+        print(
+            f"  {name:<40} runs={count} rss_delta={int(stats.get('rss_delta_kb', 0)) // count}KB "
+            f"peak={peak} cpu={int(stats.get('cpu_ms', 0)) // count}ms "
+            f"duration={int(stats.get('duration_ms', 0)) // count}ms"
+        )
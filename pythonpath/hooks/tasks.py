@@ -0,0 +1,61 @@
+"""
+Custom Celery tasks (Worker-side)
+
+Registered through CeleryConfig.imports and scheduled by superset-beat
+(see superset_worker_config.py) or enqueued by the web server.
+"""
+
+from typing import Optional
+
+from superset.extensions import celery_app
+
+
+@celery_app.task(name="iceberg.invalidate_changed_tables", ignore_result=True)
+def invalidate_changed_tables() -> None:
+    """Invalidate chart cache entries of Iceberg tables with new snapshots"""
+    from hooks.cache_invalidation import invalidate_changed_tables as invalidate
+
+    try:
+        invalidate()
+    except Exception as e:
+        print(f"[Cache Invalidation] Error polling Iceberg catalog: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+@celery_app.task(name="logs.prune_batched", ignore_result=True)
+def prune_logs_batched() -> None:
+    """Prune (and roll up) old rows of the logs table in bounded batches"""
+    from flask import current_app
+    from superset import db
+
+    from hooks.event_logging import prune_logs
+
+    config = current_app.config
+    try:
+        prune_logs(
+            db.engine,
+            retention_days=config["LOGS_RETENTION_DAYS"],
+            batch_size=config["LOGS_PRUNE_BATCH_SIZE"],
+            max_batches=config["LOGS_PRUNE_MAX_BATCHES"],
+            rollup=config["LOGS_ROLLUP_ENABLED"],
+        )
+    except Exception as e:
+        print(f"[Event Log] Error pruning logs: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+@celery_app.task(name="dashboard.load_charts_batch", ignore_result=True)
+def load_charts_batch(
+    dashboard_id: int, jobs: list, concurrency: int, deadline: Optional[float] = None
+) -> None:
+    """Compute the uncached charts of a dashboard batch request"""
+    from hooks.dashboard_batch import run_chart_jobs
+
+    try:
+        run_chart_jobs(dashboard_id, jobs, concurrency, deadline)
+    except Exception as e:
+        print(f"[Dashboard Batch] Error running dashboard {dashboard_id} batch: {e}")
+        import traceback
+        traceback.print_exc()
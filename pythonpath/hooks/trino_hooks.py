@@ -0,0 +1,78 @@
+"""
+Trino client hooks
+
+Hooks into the Trino DB-API client to add:
+- A process-wide keep-alive HTTP connection pool shared by all cursors
+
+With the thread pool worker profile (superset-worker-io) dozens of
+queries wait on Trino's nextUri long-poll concurrently in one process;
+sharing one pool avoids a TCP (and TLS) handshake per query and caps
+concurrent Trino requests per process (TRINO_HTTP_POOL_SIZE).
+
+Each connection still gets its own requests.Session (headers carry the
+user/catalog/schema of that connection), only the adapter is shared.
+"""
+
+import os
+import threading
+from functools import wraps
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+class _SharedHTTPAdapter(HTTPAdapter):
+    """Adapter that survives Session.close() of the connections using it"""
+
+    def close(self):
+        pass
+
+
+def _get_adapter() -> HTTPAdapter:
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            pool_size = int(os.environ.get("TRINO_HTTP_POOL_SIZE", 32))
+            _adapter = _SharedHTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=pool_size,
+                # Block instead of opening extra connections: per-process ceiling
+                pool_block=True,
+            )
+    return _adapter
+
+
+def _pooled_session(verify=True) -> requests.Session:
+    session = requests.Session()
+    session.verify = verify
+    adapter = _get_adapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def install_trino_http_pool():
+    """
+    Share one keep-alive HTTP connection pool across Trino connections
+
+    Patches trino.dbapi.Connection to use a pooled session when the caller
+    (SQLAlchemy dialect) did not pass its own http_session.
+    """
+    from trino.dbapi import Connection
+
+    original_init = Connection.__init__
+
+    @wraps(original_init)
+    def init_with_pool(self, *args, **kwargs):
+        if kwargs.get("http_session") is None:
+            kwargs["http_session"] = _pooled_session(kwargs.get("verify", True))
+        original_init(self, *args, **kwargs)
+
+    Connection.__init__ = init_with_pool
+    print(
+        "✓ Trino HTTP connection pool installed "
+        f"(pool size {os.environ.get('TRINO_HTTP_POOL_SIZE', 32)})"
+    )
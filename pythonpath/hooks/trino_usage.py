@@ -0,0 +1,268 @@
+"""
+Trino resource accounting
+
+Turns Trino QueryCompletedEvent payloads (HTTP event listener) into
+per-user and per-dashboard usage counters in Redis:
+- CPU time, wall time, physical input bytes, query count (summed)
+- Peak memory (max per day)
+
+Quota checks and chargeback read these measured values instead of guessed
+query costs.
+
+Shared between the Trino event receiver and the web server (quota checks).
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from hooks.redis_client import get_redis
+
+USAGE_REDIS_DB = 4
+USAGE_TTL_SECONDS = 86400 * 7
+
+USER_KEY = "trino_usage:user:{user}:{day}"
+DASHBOARD_KEY = "trino_usage:dashboard:{dashboard}:{day}"
+USER_PEAK_MEMORY_KEY = "trino_usage:peak_memory:user:{day}"
+DASHBOARD_PEAK_MEMORY_KEY = "trino_usage:peak_memory:dashboard:{day}"
+# Marks a queryId as counted: redelivered events are skipped
+SEEN_KEY = "trino_usage:seen:{query_id}"
+SEEN_TTL_SECONDS = 86400
+
+# KEYS: seen, then (counters, peak memory) per target
+# ARGV: seen TTL, usage TTL, cpu_ms, wall_ms, input_bytes, peak memory,
+#       then one peak memory member per target
+# The marker and the counters are written atomically, so a delivery that
+# fails half way is counted exactly once when the listener retries it.
+_RECORD_SCRIPT = """
+if not redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+for i = 2, #KEYS, 2 do
+    local key, peak_key = KEYS[i], KEYS[i + 1]
+    redis.call('HINCRBY', key, 'queries', 1)
+    redis.call('HINCRBY', key, 'cpu_ms', ARGV[3])
+    redis.call('HINCRBY', key, 'wall_ms', ARGV[4])
+    redis.call('HINCRBY', key, 'input_bytes', ARGV[5])
+    redis.call('EXPIRE', key, ARGV[2])
+    -- Sorted set keeps the max peak per member
+    redis.call('ZADD', peak_key, 'GT', ARGV[6], ARGV[6 + i / 2])
+    redis.call('EXPIRE', peak_key, ARGV[2])
+end
+return 1
+"""
+
+# Comments written by hooks.sql_logging.sql_query_mutator
+_SQL_USER_RE = re.compile(r"^--run:\s*(\S+)", re.MULTILINE)
+_SQL_DASHBOARD_RE = re.compile(r"^--dashboard:\s*(\d+)", re.MULTILINE)
+
+# ISO-8601 (PT1M2.5S) and airlift (1.50s, 20.00ms) duration formats
+_ISO_DURATION_RE = re.compile(
+    r"^P(?:(?P<d>[\d.]+)D)?(?:T(?:(?P<h>[\d.]+)H)?(?:(?P<m>[\d.]+)M)?(?:(?P<s>[\d.]+)S)?)?$"
+)
+_AIRLIFT_DURATION_RE = re.compile(r"^(?P<value>[\d.]+)\s*(?P<unit>ns|us|ms|s|m|h|d)$")
+_AIRLIFT_UNITS_MS = {
+    "ns": 1e-6, "us": 1e-3, "ms": 1.0, "s": 1e3, "m": 6e4, "h": 3.6e6, "d": 8.64e7,
+}
+
+
+def _duration_ms(value: Any) -> int:
+    """
+    Args:
+        value: Duration as seconds (number), ISO-8601 or airlift string
+
+    Returns:
+        int: Duration in milliseconds (0 if unparseable)
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value * 1000)
+
+    text = str(value).strip()
+    try:
+        return int(float(text) * 1000)
+    except ValueError:
+        pass
+
+    match = _ISO_DURATION_RE.match(text)
+    if match and any(match.groupdict().values()):
+        parts = {k: float(v) if v else 0.0 for k, v in match.groupdict().items()}
+        seconds = parts["d"] * 86400 + parts["h"] * 3600 + parts["m"] * 60 + parts["s"]
+        return int(seconds * 1000)
+
+    match = _AIRLIFT_DURATION_RE.match(text)
+    if match:
+        return int(float(match.group("value")) * _AIRLIFT_UNITS_MS[match.group("unit")])
+
+    return 0
+
+
+def _tag_value(client_tags: Iterable[str], name: str) -> Optional[str]:
+    """Return value of a "name:value" (or "name=value") client tag"""
+    for tag in client_tags or []:
+        for sep in (":", "="):
+            prefix = f"{name}{sep}"
+            if tag.startswith(prefix) and len(tag) > len(prefix):
+                return tag[len(prefix):]
+    return None
+
+
+def parse_query_completed(event: dict) -> Optional[dict]:
+    """
+    Args:
+        event: QueryCompletedEvent JSON payload
+
+    Returns:
+        dict: Normalized usage record, or None if the payload is not a
+              completed-query event
+    """
+    metadata = event.get("metadata") or {}
+    statistics = event.get("statistics")
+    context = event.get("context") or {}
+    if not statistics or not metadata.get("queryId"):
+        return None
+
+    sql = metadata.get("query") or ""
+    client_tags = context.get("clientTags") or []
+
+    user = _tag_value(client_tags, "user")
+    if not user:
+        match = _SQL_USER_RE.search(sql)
+        if match and match.group(1) != "None":
+            user = match.group(1)
+    if not user:
+        user = context.get("user") or "unknown"
+
+    dashboard = _tag_value(client_tags, "dashboard")
+    if not dashboard:
+        match = _SQL_DASHBOARD_RE.search(sql)
+        dashboard = match.group(1) if match else None
+
+    end_time = event.get("endTime") or event.get("createTime")
+    day = _event_day(end_time)
+
+    return {
+        "query_id": metadata["queryId"],
+        "user": user,
+        "dashboard": dashboard,
+        "day": day,
+        "cpu_ms": _duration_ms(statistics.get("cpuTime")),
+        "wall_ms": _duration_ms(statistics.get("wallTime")),
+        "input_bytes": int(statistics.get("physicalInputBytes") or 0),
+        "peak_memory_bytes": int(statistics.get("peakUserMemoryBytes") or 0),
+    }
+
+
+def _event_day(timestamp: Any) -> str:
+    """Day bucket (UTC, YYYY-MM-DD) of an event timestamp"""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = float(timestamp)
+        except ValueError:
+            pass
+    if isinstance(timestamp, (int, float)):
+        # Epoch seconds (or milliseconds)
+        seconds = timestamp / 1000 if timestamp > 1e11 else timestamp
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%d")
+    if isinstance(timestamp, str):
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            return parsed.astimezone(timezone.utc).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def record_events(events: Iterable[dict]) -> int:
+    """
+    Aggregate a batch of QueryCompletedEvent payloads into Redis
+
+    All events of the batch are sent in one pipeline; each one is counted
+    atomically with its queryId marker, events already counted are skipped.
+
+    Args:
+        events: QueryCompletedEvent payloads
+
+    Returns:
+        int: Number of events recorded (redelivered events excluded)
+    """
+    records = [r for r in (parse_query_completed(e) for e in events) if r]
+    if not records:
+        return 0
+
+    r = get_redis(USAGE_REDIS_DB)
+    script = r.register_script(_RECORD_SCRIPT)
+    pipe = r.pipeline(transaction=False)
+    for record in records:
+        keys = [
+            SEEN_KEY.format(query_id=record["query_id"]),
+            USER_KEY.format(user=record["user"], day=record["day"]),
+            USER_PEAK_MEMORY_KEY.format(day=record["day"]),
+        ]
+        members = [record["user"]]
+        if record["dashboard"]:
+            keys += [
+                DASHBOARD_KEY.format(dashboard=record["dashboard"], day=record["day"]),
+                DASHBOARD_PEAK_MEMORY_KEY.format(day=record["day"]),
+            ]
+            members.append(record["dashboard"])
+
+        script(keys=keys, args=[
+            SEEN_TTL_SECONDS,
+            USAGE_TTL_SECONDS,
+            record["cpu_ms"],
+            record["wall_ms"],
+            record["input_bytes"],
+            record["peak_memory_bytes"],
+            *members,
+        ], client=pipe)
+    return sum(pipe.execute())
+
+
+def get_user_usage(user: str, day: Optional[str] = None) -> dict:
+    """
+    Args:
+        user: User identifier (email as tagged by sql_query_mutator)
+        day: Day bucket (YYYY-MM-DD), defaults to today (UTC)
+
+    Returns:
+        dict: queries, cpu_ms, wall_ms, input_bytes, peak_memory_bytes
+    """
+    day = day or _event_day(None)
+    return _get_usage(
+        USER_KEY.format(user=user, day=day),
+        USER_PEAK_MEMORY_KEY.format(day=day),
+        user,
+    )
+
+
+def get_dashboard_usage(dashboard_id: Any, day: Optional[str] = None) -> dict:
+    """
+    Args:
+        dashboard_id: Superset dashboard ID
+        day: Day bucket (YYYY-MM-DD), defaults to today (UTC)
+
+    Returns:
+        dict: queries, cpu_ms, wall_ms, input_bytes, peak_memory_bytes
+    """
+    day = day or _event_day(None)
+    return _get_usage(
+        DASHBOARD_KEY.format(dashboard=dashboard_id, day=day),
+        DASHBOARD_PEAK_MEMORY_KEY.format(day=day),
+        str(dashboard_id),
+    )
+
+
+def _get_usage(key: str, peak_key: str, member: str) -> dict:
+    pipe = get_redis(USAGE_REDIS_DB).pipeline(transaction=False)
+    pipe.hgetall(key)
+    pipe.zscore(peak_key, member)
+    counters, peak = pipe.execute()
+    return {
+        "queries": int(counters.get("queries", 0)),
+        "cpu_ms": int(counters.get("cpu_ms", 0)),
+        "wall_ms": int(counters.get("wall_ms", 0)),
+        "input_bytes": int(counters.get("input_bytes", 0)),
+        "peak_memory_bytes": int(peak or 0),
+    }
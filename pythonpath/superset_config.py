@@ -6,6 +6,7 @@ This configuration is used by the Superset web server container.
 Imports shared configuration from superset_config_base.py and adds:
 - SQL Lab quota hooks
 - Chart/Dashboard hooks
+- Batched dashboard chart data endpoint
 - Web-specific customizations
 """
 
@@ -19,8 +20,25 @@ from superset_config_base import *
 # Web Server Specific Configuration
 # ============================================================
 
-# Additional web-specific settings can go here
-# (Currently all settings are shared in base config)
+# Batched dashboard chart data (hooks/dashboard_batch.py):
+# POST /api/v1/dashboard/<id>/batch_chart_data
+# The blueprint module only imports flask at module level
+from hooks.dashboard_batch import dashboard_batch_bp
+
+BLUEPRINTS = [dashboard_batch_bp]
+
+# Charts of one dashboard computed at the same time, across all its batch jobs
+DASHBOARD_BATCH_CONCURRENCY = 4
+# Per dashboard ID, e.g. {12: 8}
+DASHBOARD_BATCH_CONCURRENCY_OVERRIDES = {}
+DASHBOARD_BATCH_MAX_CHARTS = 100
+# How long a batch response relays chart completions before it ends
+# (clients keep waiting on the async query events after that). Each open
+# dashboard holds one gunicorn thread and reads its async event stream from
+# Redis every 0.5s for up to this long: size the web server threads for
+# concurrently loading dashboards, or lower this. Charts still waiting for a
+# dashboard slot when it ends fail with an error event
+DASHBOARD_BATCH_STREAM_TIMEOUT_SECONDS = 120
 
 
 # ============================================================
@@ -31,7 +49,8 @@ def FLASK_APP_MUTATOR(app: Flask) -> None:
     """
     Superset calls this function during app initialization
 
-    We use it to install web server hooks:
+    We use it to install web server hooks enabled in HOOKS_ENABLED["web"]
+    (or SUPERSET_HOOKS), e.g.:
     - SQL Lab quota checking
     - Chart/Dashboard force refresh fix
     - Chart debug logging
@@ -41,20 +60,13 @@ def FLASK_APP_MUTATOR(app: Flask) -> None:
     """
     print("=== Web Server: Initializing hooks ===")
 
-    # Import hooks only when app is ready
-    # from hooks.sqllab_hooks import install_sqllab_quota_hook
-    from hooks.chart_hooks import install_chart_hooks
-
-    # Install SQL Lab quota hook
-    # install_sqllab_quota_hook()
+    from hooks.registry import install_hooks
 
-    # Install Chart/Dashboard hooks
-    install_chart_hooks()
-    print("=== Web Server: All hooks installed successfully ===")
+    install_hooks("web", app.config)
+    print("=== Web Server: Hooks registered ===")
 
 def SQL_QUERY_MUTATOR(  # pylint: disable=invalid-name,unused-argument  # noqa: N802
     sql, **kwargs
 ) -> str:
     from hooks.sql_logging import sql_query_mutator
-    sql_query_mutator(sql, **kwargs)
-    return sql
+    return sql_query_mutator(sql, **kwargs)
@@ -3,14 +3,18 @@ Superset Worker & Beat Configuration
 
 This configuration is used by:
 - superset-worker: Celery worker for async query execution
+- superset-worker-io: Same, thread pool profile for IO-bound Trino queries
 - superset-beat: Celery beat scheduler for periodic tasks (reports/alerts)
 
 Imports shared configuration from superset_config_base.py and adds:
 - Celery beat schedule (periodic tasks)
+- Worker process recycling on memory growth
 - Report execution hooks
 - Worker-specific customizations
 """
 
+import os
+
 from flask import Flask
 
 # Import all shared configuration
@@ -26,6 +30,25 @@ from superset.config import CeleryConfig
 class MyCeleryConfig(CeleryConfig):
     broker_url = "redis://redis:6379/0"
     result_backend = "redis://redis:6379/1"
+    imports = CeleryConfig.imports + ("hooks.tasks",) + (
+        # bench_worker_profiles.py --celery only: runs arbitrary SQL
+        ("bench_tasks",) if os.environ.get("SUPERSET_BENCH_TASKS") == "1" else ()
+    )
+    beat_schedule = {
+        **CeleryConfig.beat_schedule,
+        "iceberg.invalidate_changed_tables": {
+            "task": "iceberg.invalidate_changed_tables",
+            "schedule": float(ICEBERG_WATCH_INTERVAL_SECONDS),
+        },
+        "logs.prune_batched": {
+            "task": "logs.prune_batched",
+            "schedule": 3600.0,  # Execute every hour
+        },
+    }
+    # Replace a prefork child once its RSS exceeds this (KB), after the
+    # task it is running finishes; the threads pool (superset-worker-io)
+    # can't recycle, its container memory limit applies
+    worker_max_memory_per_child = int(os.environ.get("CELERY_MAX_MEMORY_PER_CHILD_MB", 1024)) * 1024
     # imports = ('superset.tasks.scheduler',)
     # Beat schedule for periodic tasks (reports & alerts)
     # beat_schedule = {
@@ -41,30 +64,39 @@ class MyCeleryConfig(CeleryConfig):
 
 CELERY_CONFIG = MyCeleryConfig
 
+# Thread pool worker (superset-worker-io): every thread holds its own
+# metadata DB session, the default pool (5 + 10 overflow) would make
+# chart tasks wait on QueuePool timeouts
+if os.environ.get("SUPERSET_PROCESS_TYPE") == "worker_io":
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("CELERYD_CONCURRENCY", 32)),
+        "max_overflow": 8,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+    }
+
 # ============================================================
 # Flask App Mutator (Worker & Beat)
 # ============================================================
 
-# def FLASK_APP_MUTATOR(app: Flask) -> None:
-#     """
-#     Superset calls this function during app initialization
-
-#     We use it to install worker hooks:
-#     - Report execution logging
-#     - Celery task prerun checks
+def FLASK_APP_MUTATOR(app: Flask) -> None:
+    """
+    Superset calls this function during app initialization
 
-#     IMPORTANT: Import hooks here (not at module level) to avoid
-#     importing Superset modules before the app context is ready.
-#     """
-#     print("=== Worker: Initializing hooks ===")
+    We use it to install worker hooks enabled in HOOKS_ENABLED["worker"]
+    (superset-beat sets SUPERSET_PROCESS_TYPE=beat), e.g.:
+    - Report execution logging
+    - Celery task prerun checks
 
-#     # Import hooks only when app is ready
-#     from hooks.report_hooks import install_report_hooks
+    IMPORTANT: Import hooks here (not at module level) to avoid
+    importing Superset modules before the app context is ready.
+    """
+    print("=== Worker: Initializing hooks ===")
 
-#     # Install report execution hooks
-#     install_report_hooks()
+    from hooks.registry import install_hooks
 
-#     print("=== Worker: All hooks installed successfully ===")
+    install_hooks("worker", app.config)
+    print("=== Worker: Hooks registered ===")
 
 
 # import hooks.report_hooks
@@ -73,5 +105,4 @@ def SQL_QUERY_MUTATOR(  # pylint: disable=invalid-name,unused-argument  # noqa:
     sql, **kwargs
 ) -> str:
     from hooks.sql_logging import sql_query_mutator
-    sql_query_mutator(sql, **kwargs)
-    return sql
+    return sql_query_mutator(sql, **kwargs)
@@ -0,0 +1,46 @@
+"""
+Trino HTTP Event Listener Receiver
+
+Lightweight service that receives Trino's HTTP event listener POSTs
+(trino/http-event-listener.properties) and aggregates QueryCompletedEvent
+statistics into per-user / per-dashboard Redis counters (hooks.trino_usage).
+
+Accepts a single event object or a JSON array of events per request, so
+recorded fixtures can be replayed in batches:
+
+    curl -X POST -H 'Content-Type: application/json' \
+        --data @trino/event-fixtures/query_completed.json \
+        http://localhost:8090/v1/events
+
+Run (superset image, PYTHONPATH=/app/pythonpath):
+    gunicorn -b 0.0.0.0:8090 trino_event_receiver:app
+"""
+
+from flask import Flask, jsonify, request
+
+from hooks.trino_usage import record_events
+
+app = Flask(__name__)
+
+
+@app.route("/v1/events", methods=["POST"])
+def ingest_events():
+    """Ingest one QueryCompletedEvent or a batch (JSON array) of them"""
+    payload = request.get_json(force=True, silent=True)
+    if payload is None:
+        return jsonify({"error": "invalid JSON payload"}), 400
+
+    events = payload if isinstance(payload, list) else [payload]
+    try:
+        recorded = record_events(e for e in events if isinstance(e, dict))
+    except Exception as e:
+        # Trino retries failed deliveries (http-event-listener.connect-retry-count)
+        print(f"[Trino Events] Error recording events: {e}")
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({"received": len(events), "recorded": recorded}), 200
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    return jsonify({"status": "ok"}), 200